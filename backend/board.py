@@ -1,8 +1,8 @@
 import random
-import copy
 
 # GLOBAL VARIABLES
-from utils import TO_64
+from utils import TO_64, WHITE, BLACK
+from piece_square_tables import MG_SQUARE_SCORES, EG_SQUARE_SCORES, PHASE_SCORES   # incremental evaluation terms
 
 PIECE_CODES = {         # used to map each piece to an array index in zorbist table for pieces
     'P': 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'K': 5, 
@@ -12,14 +12,40 @@ PIECE_CODES = {         # used to map each piece to an array index in zorbist ta
 # global random Zobrist values, 64-bit ints, used to compute init. position's hash & incremented with XORs when making moves
 random.seed(0)      # for reproducibility
 
+# keys are 63-bit so every hash fits a signed machine word, PyPy then keeps hashes (and the TT's hash list) unboxed
+
 # unique int for each piece-square combination: 12 pieces (6 white + 6 black), 64 board squares
-ZOBRIST_PIECE_KEYS = [[random.getrandbits(64) for _ in range(12)] for _ in range(64)]
+ZOBRIST_PIECE_KEYS = [[random.getrandbits(63) for _ in range(12)] for _ in range(64)]
 # castling rights: 16 possibilities
-ZOBRIST_CASTLING_KEYS = [random.getrandbits(64) for _ in range(16)]
+ZOBRIST_CASTLING_KEYS = [random.getrandbits(63) for _ in range(16)]
 # en passant file keys: 8 files
-ZOBRIST_EP_KEYS = [random.getrandbits(64) for _ in range(8)]
+ZOBRIST_EP_KEYS = [random.getrandbits(63) for _ in range(8)]
 # side to move key
-ZOBRIST_COLOR_KEY = random.getrandbits(64)
+ZOBRIST_COLOR_KEY = random.getrandbits(63)
+
+# castling rights kept after a move touches each square, ANDed into the rights code from get_castle_rights_code()
+# king home squares clear both of that side's rights, rook home squares clear the right on their wing
+CASTLE_RIGHTS_MASKS = [15] * 120
+CASTLE_RIGHTS_MASKS[95] = 15 & ~(1 | 2)     # e1
+CASTLE_RIGHTS_MASKS[98] = 15 & ~1           # h1
+CASTLE_RIGHTS_MASKS[91] = 15 & ~2           # a1
+CASTLE_RIGHTS_MASKS[25] = 15 & ~(4 | 8)     # e8
+CASTLE_RIGHTS_MASKS[28] = 15 & ~4           # h8
+CASTLE_RIGHTS_MASKS[21] = 15 & ~8           # a8
+
+# change in the incremental mg/eg scores for each castling move, keyed by the king's destination index
+# each castle moves a king and a rook between fixed squares: (king, rook, king source, king dest, rook source, rook dest)
+CASTLE_SCORE_DELTAS = {}
+for king, rook, king_source, king_dest, rook_source, rook_dest in (
+    ('K', 'R', 95, 97, 98, 96), ('K', 'R', 95, 93, 91, 94),
+    ('k', 'r', 25, 27, 28, 26), ('k', 'r', 25, 23, 21, 24),
+):
+    CASTLE_SCORE_DELTAS[king_dest] = (
+        MG_SQUARE_SCORES[king][king_dest] - MG_SQUARE_SCORES[king][king_source]
+        + MG_SQUARE_SCORES[rook][rook_dest] - MG_SQUARE_SCORES[rook][rook_source],
+        EG_SQUARE_SCORES[king][king_dest] - EG_SQUARE_SCORES[king][king_source]
+        + EG_SQUARE_SCORES[rook][rook_dest] - EG_SQUARE_SCORES[rook][rook_source],
+    )
 
 # BOARD AND MOVE CLASSES
 class Board:
@@ -40,13 +66,14 @@ class Board:
             -1,  -1,  -1,  -1,  -1,  -1,  -1,  -1,  -1, -1,
             -1,  -1,  -1,  -1,  -1,  -1,  -1,  -1,  -1, -1
         ]
-        self.color_to_play = 'white'
+        self.color_to_play = WHITE          # WHITE = 0, BLACK = 1 (see utils.py)
         
         # castling rights
         self.white_castle_kingside = True
         self.white_castle_queenside = True
         self.black_castle_kingside = True
         self.black_castle_queenside = True
+        self.castle_rights = 15             # the four rights packed as in get_castle_rights_code(), kept in sync by make_move
         
         self.half_move = 0                  # tracks captures and pawn advances for fifty move rule 
         self.ply = 0                        # tracks half-moves since game start
@@ -61,6 +88,9 @@ class Board:
         self.initialize_piece_lists()            # initialize piece list indices
         self.zobrist_hash = self.compute_hash()  # a hash of the position, used in engine.py's transposition table
 
+        # incremental evaluation: running mg/eg material + PST totals (white minus black) and game phase
+        self.mg_score, self.eg_score, self.game_phase = self.compute_scores()
+
         self.history = [self.zobrist_hash]       # initialize game history, detects 50-move rule and threefold repetition
     
     # sets the initial index for each piece on the board
@@ -90,11 +120,25 @@ class Board:
             hash ^= ZOBRIST_EP_KEYS[ep_file]
 
         # STEP 4: color to play updates
-        if self.color_to_play == 'black':
+        if self.color_to_play == BLACK:
             hash ^= ZOBRIST_COLOR_KEY       # XOR regardless of color to toggle hash at each ply
 
         return hash
     
+    # computes the incremental evaluation terms from scratch, make_move / unmake_move keep them updated afterwards
+    def compute_scores(self):
+        mg_score = 0
+        eg_score = 0
+        game_phase = 0
+
+        for piece_type in self.piece_lists:
+            for sq_index in self.piece_lists[piece_type]:
+                mg_score += MG_SQUARE_SCORES[piece_type][sq_index]
+                eg_score += EG_SQUARE_SCORES[piece_type][sq_index]
+                game_phase += PHASE_SCORES[piece_type]
+
+        return mg_score, eg_score, game_phase
+
     # helper function to map each castling right combination to a Zobrist index code from 0-15 using bitwise OR
     def get_castle_rights_code(self):
         index_code = 0
@@ -110,6 +154,16 @@ class Board:
     def make_move(self, move):
         moving_piece = move.moving_piece
         piece_captured = move.piece_captured
+
+        # save the state snapshot on the move for unmake_move, taken here rather than at generation so that building
+        # a move list only allocates the moves themselves, and the snapshot is paid for just the moves that are played
+        move.previous_castle_rights = self.castle_rights                 # all four rights packed into one int
+        move.previous_en_passant_square = self.en_passant_square
+        move.previous_half_move = self.half_move
+        move.previous_zobrist_hash = self.zobrist_hash
+        mg_score = move.previous_mg_score = self.mg_score
+        eg_score = move.previous_eg_score = self.eg_score
+        move.previous_game_phase = self.game_phase
         
         # MAKE THE MOVE, UPDATE PIECE LISTS / ZOBRIST HASH
         if (not move.is_en_passant) and (not move.is_castle): # if not a special move
@@ -121,18 +175,29 @@ class Board:
             
             self.piece_lists[moving_piece].remove(move.source_index)
             
-            # remove the captured piece (if any) from its piece list and XOR it out of hash
+            mg_score -= MG_SQUARE_SCORES[moving_piece][move.source_index]
+            eg_score -= EG_SQUARE_SCORES[moving_piece][move.source_index]
+            
+            # remove the captured piece (if any) from its piece list, XOR it out of hash and the incremental scores
             if piece_captured:
                 self.piece_lists[piece_captured].remove(move.destination_index)
                 self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[move.destination_index]][PIECE_CODES[move.piece_captured]]    
+                mg_score -= MG_SQUARE_SCORES[piece_captured][move.destination_index]
+                eg_score -= EG_SQUARE_SCORES[piece_captured][move.destination_index]
+                self.game_phase -= PHASE_SCORES[piece_captured]
 
             if move.promotion_piece: # if this is a promotion
                 self.board[move.destination_index] = move.promotion_piece
                 self.piece_lists[move.promotion_piece].append(move.destination_index) 
                 self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[move.destination_index]][PIECE_CODES[move.promotion_piece]]
+                mg_score += MG_SQUARE_SCORES[move.promotion_piece][move.destination_index]
+                eg_score += EG_SQUARE_SCORES[move.promotion_piece][move.destination_index]
+                self.game_phase += PHASE_SCORES[move.promotion_piece]
             else:
                 self.piece_lists[moving_piece].append(move.destination_index)         # add dest index to moving piece list
                 self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[move.destination_index]][PIECE_CODES[moving_piece]] 
+                mg_score += MG_SQUARE_SCORES[moving_piece][move.destination_index]
+                eg_score += EG_SQUARE_SCORES[moving_piece][move.destination_index]
                     
         elif move.is_en_passant: # if move was en passant
             self.board[move.source_index] = '#'
@@ -143,18 +208,27 @@ class Board:
 
             self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[move.source_index]][PIECE_CODES[moving_piece]]
             self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[move.destination_index]][PIECE_CODES[moving_piece]]
+
+            mg_score += MG_SQUARE_SCORES[moving_piece][move.destination_index] - MG_SQUARE_SCORES[moving_piece][move.source_index]
+            eg_score += EG_SQUARE_SCORES[moving_piece][move.destination_index] - EG_SQUARE_SCORES[moving_piece][move.source_index]
             
-            if self.color_to_play == 'white':                          # remove captured pawn
-                self.board[move.destination_index + 10] = '#'          # destination_index = previous en_passant_square val
-                self.piece_lists[piece_captured].remove(move.destination_index + 10)
-                self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[move.destination_index + 10]][PIECE_CODES[move.piece_captured]]
+            if self.color_to_play == WHITE:                            # remove captured pawn
+                captured_index = move.destination_index + 10           # destination_index = previous en_passant_square val
             else:
-                self.board[move.destination_index - 10] = '#'          # destination_index = previous en_passant_square val
-                self.piece_lists[piece_captured].remove(move.destination_index - 10)
-                self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[move.destination_index - 10]][PIECE_CODES[move.piece_captured]]
+                captured_index = move.destination_index - 10           # destination_index = previous en_passant_square val
+
+            self.board[captured_index] = '#'
+            self.piece_lists[piece_captured].remove(captured_index)
+            self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[captured_index]][PIECE_CODES[move.piece_captured]]
+            mg_score -= MG_SQUARE_SCORES[piece_captured][captured_index]
+            eg_score -= EG_SQUARE_SCORES[piece_captured][captured_index]
             
         # for castling moves move.destination_index will be the king's final square and is_castle flag will be True    
         elif move.is_castle:                                        # if move was to castle
+            mg_delta, eg_delta = CASTLE_SCORE_DELTAS[move.destination_index]
+            mg_score += mg_delta
+            eg_score += eg_delta
+
             if move.destination_index == 97:                        # if white is castling kingside
                 # move king to g1
                 self.board[move.destination_index] = 'K'            
@@ -228,17 +302,16 @@ class Board:
                 self.zobrist_hash ^= ZOBRIST_PIECE_KEYS[TO_64[24]][PIECE_CODES['r']]
         
         # UPDATE GAME STATE VALUES
+        self.mg_score = mg_score
+        self.eg_score = eg_score
         self.ply += 1
         
         # update color_to_play
-        if self.color_to_play == 'white':
-            self.color_to_play = 'black'
-        else:
-            self.color_to_play = 'white'
+        self.color_to_play ^= 1
         self.zobrist_hash ^= ZOBRIST_COLOR_KEY      # toggle color to play in Zobrist hash
         
         # update 50-move-rule counter
-        if moving_piece.lower() == 'p' or move.piece_captured != None:            # if a pawn move or capture
+        if moving_piece == 'P' or moving_piece == 'p' or move.piece_captured != None:   # if a pawn move or capture
             self.half_move = 0    
         else:
             self.half_move += 1
@@ -267,37 +340,22 @@ class Board:
             ep_file = ep_square % 8     # for 0 to 7
             self.zobrist_hash ^= ZOBRIST_EP_KEYS[ep_file]
                     
-        # reset castling rights
-        # first, XOR-out the current castle rights from Zobrist hash
-        index_code = self.get_castle_rights_code()
-        self.zobrist_hash ^= ZOBRIST_CASTLING_KEYS[index_code]
-
-        if move.is_castle:                                      # if the move was to castle
-            if moving_piece == 'K':                             # if white castled
-                self.white_castle_kingside = False
-                self.white_castle_queenside = False
-            elif moving_piece == 'k':                           # if black castled
-                self.black_castle_kingside = False
-                self.black_castle_queenside = False
-        else:                                                   # if the move wasn't to castle
-            if moving_piece == 'K':                             # if white moved their king
-                self.white_castle_kingside = False
-                self.white_castle_queenside = False
-            if moving_piece == 'k':                             # if black moved their king
-                self.black_castle_kingside = False
-                self.black_castle_queenside = False
-            if self.board[98] != "R":                           # if h1 square is not a white rook
-                self.white_castle_kingside = False              
-            if self.board[91] != "R":                           # if a1 square is not a white rook
-                self.white_castle_queenside = False             
-            if self.board[28] != "r":                           # if h8 square is not a black rook
-                self.black_castle_kingside = False              
-            if self.board[21] != "r":                           # if a8 square is not a black rook
-                self.black_castle_queenside = False   
-        
-        # XOR-in the current castle rights to Zobrist hash
-        index_code = self.get_castle_rights_code()
-        self.zobrist_hash ^= ZOBRIST_CASTLING_KEYS[index_code]
+        # update castling rights, a move from or to a king or rook home square clears the rights tied to that square
+        # once all four rights are gone (most of the game) this is a single falsy check
+        castle_rights = self.castle_rights
+        if castle_rights:
+            new_castle_rights = (
+                castle_rights & CASTLE_RIGHTS_MASKS[move.source_index] & CASTLE_RIGHTS_MASKS[move.destination_index]
+            )
+            if new_castle_rights != castle_rights:
+                self.castle_rights = new_castle_rights
+
+                # swap the old castle rights for the new ones in the Zobrist hash
+                self.zobrist_hash ^= ZOBRIST_CASTLING_KEYS[castle_rights] ^ ZOBRIST_CASTLING_KEYS[new_castle_rights]
+                self.white_castle_kingside = new_castle_rights & 1 != 0
+                self.white_castle_queenside = new_castle_rights & 2 != 0
+                self.black_castle_kingside = new_castle_rights & 4 != 0
+                self.black_castle_queenside = new_castle_rights & 8 != 0
 
         # add new position to the game history list
         self.history.append(self.zobrist_hash)
@@ -397,23 +455,63 @@ class Board:
         # RESTORE PREVIOUS GAME STATE VARIABLES
         self.ply -= 1
 
-        # revert color to play
-        self.color_to_play = move.previous_color_to_play
+        # revert color to play, make_move always flips it so no snapshot is needed
+        self.color_to_play ^= 1
 
         self.half_move = move.previous_half_move                    # revert 50 move rule counter
         self.en_passant_square = move.previous_en_passant_square    # revert en passant square
 
-        # revert castling rights
-        self.white_castle_kingside = move.previous_white_castle_kingside
-        self.white_castle_queenside = move.previous_white_castle_queenside
-        self.black_castle_kingside = move.previous_black_castle_kingside
-        self.black_castle_queenside = move.previous_black_castle_queenside
+        # revert castling rights, decoded from the bits set by get_castle_rights_code(), only if the move changed them
+        castle_rights = move.previous_castle_rights
+        if castle_rights != self.castle_rights:
+            self.castle_rights = castle_rights
+            self.white_castle_kingside = castle_rights & 1 != 0
+            self.white_castle_queenside = castle_rights & 2 != 0
+            self.black_castle_kingside = castle_rights & 4 != 0
+            self.black_castle_queenside = castle_rights & 8 != 0
 
         # revert Zobrist hash
         self.zobrist_hash = move.previous_zobrist_hash
 
+        # revert incremental evaluation terms
+        self.mg_score = move.previous_mg_score
+        self.eg_score = move.previous_eg_score
+        self.game_phase = move.previous_game_phase
+
         # revert updates to the game history list
         self.history.pop()
+
+    # passes the turn without moving a piece, used by null-move pruning in engine.py
+    # returns the state that unmake_null_move needs to restore the position
+    def make_null_move(self):
+        null_state = (self.en_passant_square, self.half_move, self.zobrist_hash)
+
+        # XOR-out the en passant square (if any) from Zobrist hash, it expires with the passed turn
+        if self.en_passant_square:
+            ep_square = TO_64[self.en_passant_square]
+            ep_file = ep_square % 8     # for 0 to 7
+            self.zobrist_hash ^= ZOBRIST_EP_KEYS[ep_file]
+            self.en_passant_square = None
+
+        # update color_to_play
+        self.color_to_play ^= 1
+        self.zobrist_hash ^= ZOBRIST_COLOR_KEY      # toggle color to play in Zobrist hash
+
+        # reset the 50-move-rule counter so repetition checks never look back across the null move
+        self.half_move = 0
+        self.ply += 1
+        self.history.append(self.zobrist_hash)
+
+        return null_state
+
+    # null_state is the tuple returned by the matching make_null_move call
+    def unmake_null_move(self, null_state):
+        self.en_passant_square, self.half_move, self.zobrist_hash = null_state
+
+        self.color_to_play ^= 1
+
+        self.ply -= 1
+        self.history.pop()
     
     def fifty_move_criteria_met(self):      # checks if criteria for fifty move rule have been met
         return self.half_move == 100
@@ -421,7 +519,8 @@ class Board:
     # used to make a copy of the current board before starting a search
     # this is necessary to prevent iterative deepening time cap from abruptly preventing move reversal
     def copy(self):
-        new_board = Board()
+        # every attribute is assigned below, so __init__ (piece list scan, hash and score computation) is skipped
+        new_board = Board.__new__(Board)
 
         # Copy all attributes
         new_board.board = self.board[:]
@@ -430,14 +529,18 @@ class Board:
         new_board.white_castle_queenside = self.white_castle_queenside
         new_board.black_castle_kingside = self.black_castle_kingside
         new_board.black_castle_queenside = self.black_castle_queenside
+        new_board.castle_rights = self.castle_rights
         new_board.half_move = self.half_move
         new_board.ply = self.ply
         new_board.en_passant_square = self.en_passant_square
         new_board.zobrist_hash = self.zobrist_hash
+        new_board.mg_score = self.mg_score
+        new_board.eg_score = self.eg_score
+        new_board.game_phase = self.game_phase
         new_board.history = self.history[:]
         
-        # Deepcopy the piece_lists dictionary
-        new_board.piece_lists = copy.deepcopy(self.piece_lists)
+        # copy each piece list, the values are plain lists of ints so deepcopy's generic recursion is not needed
+        new_board.piece_lists = {piece: indices[:] for piece, indices in self.piece_lists.items()}
         
         return new_board
 
@@ -465,14 +568,14 @@ class Move:
     __slots__ = [
         'moving_piece', 'source_index', 'destination_index', 'piece_captured', 
         'is_en_passant', 'is_castle', 'promotion_piece', 
-        'previous_white_castle_kingside', 'previous_white_castle_queenside',
-        'previous_black_castle_kingside', 'previous_black_castle_queenside',
-        'previous_en_passant_square', 'previous_half_move', 
-        'previous_color_to_play', 'previous_zobrist_hash'
+        'previous_castle_rights', 'previous_en_passant_square', 'previous_half_move',   # all written by make_move,
+        'previous_zobrist_hash',                                                          # not at generation
+        'previous_mg_score', 'previous_eg_score', 'previous_game_phase',
+        'order_score'
     ]
 
     def __init__(
-            self, position, moving_piece, source_index, destination_index, 
+            self, moving_piece, source_index, destination_index, 
             piece_captured, is_en_passant, is_castle, promotion_piece=None
         ):
         # basic move information for making and unmaking
@@ -485,13 +588,6 @@ class Move:
         self.is_en_passant = is_en_passant
         self.is_castle = is_castle
         self.promotion_piece = promotion_piece
-        
-        # capture previous special move values for unmaking moves
-        self.previous_white_castle_kingside = position.white_castle_kingside
-        self.previous_white_castle_queenside = position.white_castle_queenside
-        self.previous_black_castle_kingside = position.black_castle_kingside
-        self.previous_black_castle_queenside = position.black_castle_queenside
-        self.previous_en_passant_square = position.en_passant_square
-        self.previous_half_move = position.half_move
-        self.previous_color_to_play = position.color_to_play
-        self.previous_zobrist_hash = position.zobrist_hash
\ No newline at end of file
+
+        # move-ordering score, written by the search just before sorting a move list
+        self.order_score = 0
\ No newline at end of file
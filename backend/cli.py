@@ -5,7 +5,7 @@ import time
 
 # HELPER FUNCTIONS FOR THE GAME LOOP
 # a mapping from 10x12 indices to standard algebraic notation.
-from utils import INDEX_TO_ALGEBRAIC, ALGEBRAIC_TO_INDEX, parse_user_move, move_to_algebraic
+from utils import INDEX_TO_ALGEBRAIC, ALGEBRAIC_TO_INDEX, parse_user_move, move_to_algebraic, WHITE, BLACK
 
 # prints the board to the console in a human-readable format
 def print_board(position):
@@ -35,6 +35,7 @@ def play_game(human_color='white', max_think_time=6):
     board = Board()
     search = Search(depth=64)
     engine_color = 'black' if human_color == 'white' else 'white'
+    human_color_code = WHITE if human_color == 'white' else BLACK   # board.color_to_play stores an int color code
 
     while True:
         print_board(board)
@@ -46,14 +47,14 @@ def play_game(human_color='white', max_think_time=6):
         if not legal_moves:
             if check_count > 0:
                 print('Checkmate!')
-                winner = 'black' if board.color_to_play == 'white' else 'white'
+                winner = 'black' if board.color_to_play == WHITE else 'white'
                 print(f'{winner} wins!')
             else:
                 print('Stalemate! The game is a draw.')
             break
 
         # player's turn
-        if board.color_to_play == human_color:
+        if board.color_to_play == human_color_code:
             move_to_make = None
             while move_to_make is None:
                 user_input = input('Enter your move (e.g. e2e4): ')
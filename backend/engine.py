@@ -1,33 +1,72 @@
 # for search
 from board import Board, Move
-from evaluation import evaluate_position
-from move_generator import generate_moves
+from evaluation import evaluate_relative
+from move_generator import generate_moves, static_exchange_eval, in_check
+from operator import attrgetter
 import time
 
 # for opening book
 import chess
 import chess.polyglot
 import random
-from utils import board_to_fen, move_to_algebraic   # move_to_algebraic used in commented debug prints
-from utils import parse_user_move
+from utils import move_to_algebraic
+from utils import parse_user_move, ALGEBRAIC_TO_INDEX, WHITE
 
 # ----------------------------------- GLOBAL CONSTANTS -----------------------------------
-INFINITY = float('inf') # infinity constant
+# integer infinity constant, kept as a plain int so every search score stays a machine-sized integer
+# (mixing float('inf') into int comparisons forces boxed, generic comparisons on each node)
+INFINITY = 1000000
+
+# base score for checkmates, adjusted by ply so that faster mates are preferred
+MATE_SCORE = 99999
 MAX_DEPTH = 64 # used to initialize killer table
 
-# used in MVV-LVA move-ordering, king value as highest b/c we want king captures to be attempted last
-PIECE_VALUES = {'k': 10, 'q': 9, 'r': 5, 'b': 3.3, 'n': 3.2, 'p': 1}   
+# used in MVV-LVA move-ordering and delta pruning, king value as highest b/c we want king captures to be attempted last
+# centipawn values in a 128-entry list indexed by ord(piece), both cases populated: one list load, no .lower() / dict hash
+PIECE_VALUES = [0] * 128
+for _piece, _value in (('p', 100), ('n', 320), ('b', 330), ('r', 500), ('q', 900), ('k', 1000)):
+    PIECE_VALUES[ord(_piece)] = PIECE_VALUES[ord(_piece.upper())] = _value
+
+# move-ordering score for killer moves at the root and in quiescence, captures score 1000+ via MVV_LVA_SCORES
+KILLER_MOVE_SCORE = 900
+
+# sort key for move lists, reads the order_score slot written on each Move by the move-ordering pass
+ORDER_SCORE = attrgetter('order_score')
+
+# yields a scored move list in descending order_score order, lazily: the best move is found with one linear scan, and
+# the rest are only sorted if the search asks for a second move, most cutoffs happen on the first move of a stage
+# max() returns the first of any tied moves, so the order matches a stable descending sort of the whole list
+def best_first(moves):
+    if not moves:
+        return
+    best_move = max(moves, key=ORDER_SCORE)
+    yield best_move
+
+    moves.remove(best_move)
+    moves.sort(key=ORDER_SCORE, reverse=True)
+    yield from moves
+
+# precomputed MVV-LVA capture scores, indexed as MVV_LVA_SCORES[piece_captured][moving_piece]
+# both piece cases are keyed directly so no .lower() calls are needed while ordering moves
+MVV_LVA_SCORES = {
+    victim: {
+        attacker: 1000 + PIECE_VALUES[ord(victim)] - PIECE_VALUES[ord(attacker)] // 10
+        for attacker in 'PNBRQKpnbrqk'
+    }
+    for victim in 'PNBRQKpnbrqk'
+}
 
 # used to limit the number of entries in the transposition table (TT) to avoid memory overflow
 # 2^18 = 262,144 entries, using a power of 2 allows lookups using the faster bitwise AND as opposed to modulo
+# entries are paired into 2^17 two-slot buckets: slot 2b is depth-preferred, slot 2b + 1 is always-replace
 TT_SIZE = 262144 
 
-# used in history table piece identification
-# outer-index pieces: 0='P', 1='N', 2='B', 3='R', 4='Q', 5='K', 6='p', 7='n', 8='b', 9='r', 10='q', 11='k'
-HISTORY_OUTER_INDICES = {
-    'P': 0, 'N': 1, 'B': 2, 'R': 3, 'Q': 4, 'K': 5,
-    'p': 6, 'n': 7, 'b': 8, 'r': 9, 'q': 10, 'k': 11,
-}
+# TT entries are stored as a struct of arrays, one parallel list per field sharing the same slot index, so a store is a
+# handful of list writes with no allocation, and under PyPy the int fields stay unboxed int lists
+# fields: hash (0 = empty slot), eval, depth, flag, age, best_move, bound flags are small ints instead of strings
+TT_EXACT = 0
+TT_LOWERBOUND = 1
+TT_UPPERBOUND = 2
 
 # used in delta pruning for quiescence search
 DELTA = 100
@@ -38,6 +77,34 @@ FUTILITY_MARGINS = [0, 100, 300]
 # used to disable futility in winning positions to prevent excessive pruning
 WIN_SCORE = 500  # a rook's value
 
+# aspiration window half-widths around the previous depth's eval, widened in order after each fail-high / fail-low
+# the final step is a full window, so each bound is widened at most twice before falling back to +/- infinity
+ASPIRATION_WINDOWS = [50, 200, INFINITY]
+ASPIRATION_MIN_DEPTH = 4  # shallower evals are too unstable to center a window on
+
+# null-move pruning: minimum depth to try it, and the depth reduction for the null-move search (raised for deep nodes)
+NULL_MOVE_MIN_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_DEEP_REDUCTION = 3    # used when depth > 6
+
+# internal iterative deepening: at PV nodes with no hash move, a reduced search is run first to find one
+IID_MIN_DEPTH = 4
+IID_REDUCTION = 2
+
+# opening book lookups hash the board straight into the polyglot key format instead of round-tripping through a FEN
+# and a python-chess board, random array layout: 768 piece-square keys, 4 castling keys, 8 en passant files, 1 turn key
+POLYGLOT_RANDOM_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+POLYGLOT_PIECE_OFFSETS = {  # 64 * piece kind, kinds ordered black pawn, white pawn, black knight, ... white king
+    piece: 64 * (2 * 'pnbrqk'.index(piece.lower()) + piece.isupper())
+    for piece in 'PNBRQKpnbrqk'
+}
+POLYGLOT_SQUARES = [       # 120-index board square to polyglot square (a1 = 0, h8 = 63), -1 when off the board
+    (9 - index // 10) * 8 + (index % 10 - 1) if 21 <= index <= 98 and 1 <= index % 10 <= 8 else -1
+    for index in range(120)
+]
+# polyglot encodes castling as the king capturing its own rook, mapped back to the king's destination square
+POLYGLOT_CASTLES = {'e1h1': 'e1g1', 'e1a1': 'e1c1', 'e8h8': 'e8g8', 'e8a8': 'e8c8'}
+
 class Search:
     class TimeUpError(Exception):
         # Exception raised when the time limit for a search is exceeded
@@ -47,42 +114,126 @@ class Search:
         self.depth = depth
         self.max_q_depth = 0         # track maximum depth reached in quiescence search
         self.nodes_searched = 0      # track total positions explored per root search
+        self.deadline = float('inf') # time.monotonic() value at which the running search must stop
 
         # KILLER TABLE: at each depth, store 'killer' moves: extremely strong quiet moves in sibling node
-        # stores a maximum of two killer Move objects for each depth
-        self.killer_table = [[None, None] for _ in range(MAX_DEPTH + 1)]
+        # stores a maximum of two killers for each depth in one flat list, slots depth * 2 and depth * 2 + 1
+        # killers are stored as integer move keys (source_index | destination_index << 7) so they match across sibling nodes, 0 = empty
+        self.killer_table = [0] * (2 * (MAX_DEPTH + 1))
 
         # HISTORY TABLE: stores moves that caused beta cutoffs for use in move-ordering, bonus given for higher depths
-        # for each piece type, store a score for all possible destination squares, update when a move creates a beta cutoff
+        # "butterfly" layout, one score per (source, destination) square pair, update when a move creates a beta cutoff
+        # flat list indexed by the same source_index | destination_index << 7 key the killer table stores
         # all initial scores are 0, bonuses are added based on depth-squared
-        self.history_table = [[0] * 120 for _ in range(12)]  
+        self.history_table = [0] * (120 << 7)
+
+        # COUNTER-MOVE TABLE: for each previous move, the quiet move that last refuted it with a beta cutoff
+        # indexed by the previous move's key and storing the refutation's key, both in the killer table's key format
+        self.counter_moves = [0] * (120 << 7)
+
+        # PRINCIPAL VARIATION: pv_table[i] holds the best line found from the node whose pv move is at line index i
+        # index 0 is the root move, a minimax node at ply p stores its line at p + 1, each node resets its slot on entry
+        # previous_pv is the root line of the last completed depth, tried first at every node along that line
+        self.pv_table = [[] for _ in range(MAX_DEPTH + 2)]
+        self.previous_pv = []
+        self.follow_pv = False   # true only while the node being entered lies on previous_pv
 
         # TRANSPOSITION TABLE: a hash table of previously encountered positions
         # if position was fully evaluated, skip the branch, otherwise update alpha/beta if it tightens the search window
-        self.transposition_table = [None] * TT_SIZE
+        self.tt_hashes = [0] * TT_SIZE
+        self.tt_evals = [0] * TT_SIZE
+        self.tt_depths = [0] * TT_SIZE
+        self.tt_flags = [0] * TT_SIZE
+        self.tt_ages = [0] * TT_SIZE      # search_cycle of the store, 0 (empty) is older than any search
+        self.tt_moves = [None] * TT_SIZE
         self.tt_size = TT_SIZE
+        self.tt_mask = (TT_SIZE >> 1) - 1   # precomputed bucket mask, depth-preferred slot = (hash & tt_mask) << 1
         self.search_cycle = 0  # used in TT replacement strategy to allow prioritization of newer entries
 
     # MOVE ORDERING: sort the legal_moves to 'guess' which ones will be best, try them first for a fast beta cutoff
-    def score_move(self, move, depth, hash_move=None):
-        if hash_move is not None and move == hash_move:     # top priority: hash moves from transposition table
-            return 2000
-        
-        elif move.piece_captured:                           # 2nd priority: captures, MVV-LVA
-            victim_value = PIECE_VALUES[move.piece_captured.lower()]
-            attacker_value = PIECE_VALUES[move.moving_piece.lower()]
-            return 1000 + (victim_value * 10) - attacker_value
-        
-        elif move in self.killer_table[depth]:              # 3rd priority: quiet 'killer' moves
-            return 900
-        
-        else:                                               # last priority, use history table score 
-            # determine moving piece's history-table index 
-            pc_type_index = HISTORY_OUTER_INDICES[move.moving_piece]
-            return self.history_table[pc_type_index][move.destination_index]  
+    # all moves are scored in a single pass into their order_score slot, then sorted in place on that attribute
+    # priority: captures w/ MVV-LVA -> killer moves -> history table score, used at the root and in quiescence
+    def order_moves(self, legal_moves, depth):
+        killer_1 = self.killer_table[depth * 2]
+        killer_2 = self.killer_table[depth * 2 + 1]
+        history_table = self.history_table
 
-    # iterative deepening wrapper for search_root
-    def find_best_move(self, root_node, color_to_play, time_limit=5):
+        for move in legal_moves:
+            if move.piece_captured:                             # 1st priority: captures, MVV-LVA
+                move.order_score = MVV_LVA_SCORES[move.piece_captured][move.moving_piece]
+            else:
+                move_key = move.source_index | (move.destination_index << 7)
+                if move_key == killer_1 or move_key == killer_2:  # 2nd priority: quiet 'killer' moves
+                    move.order_score = KILLER_MOVE_SCORE
+                else:                                           # last priority, use history table score
+                    move.order_score = history_table[move_key]
+
+        # sort by score in descending order, the sort is stable so ties keep their generation order
+        legal_moves.sort(key=ORDER_SCORE, reverse=True)
+        return legal_moves
+
+    # STAGED MOVE ORDERING: used by minimax, yields moves one stage at a time so a cutoff skips the later stages' work
+    # stages: hash move -> captures w/ MVV-LVA -> killer moves -> counter move -> quiets by history table score
+    # the hash move comes from another node, so it is matched by squares and promotion piece rather than identity
+    def staged_moves(self, legal_moves, depth, hash_move=None, counter_move_key=0):
+        # STAGE 1: hash move from the transposition table, yielded before anything is scored
+        found_hash_move = None
+        if hash_move is not None:
+            hash_source = hash_move.source_index
+            hash_destination = hash_move.destination_index
+            hash_promotion = hash_move.promotion_piece
+            for move in legal_moves:
+                if (
+                    move.source_index == hash_source 
+                    and move.destination_index == hash_destination 
+                    and move.promotion_piece == hash_promotion
+                ):
+                    found_hash_move = move
+                    yield move
+                    break
+
+        # split the remaining moves into captures, killers and quiets
+        killer_1 = self.killer_table[depth * 2]
+        killer_2 = self.killer_table[depth * 2 + 1]
+        captures = []
+        killers = []
+        counter_move = None
+        quiets = []
+
+        for move in legal_moves:
+            if move is found_hash_move:
+                continue
+            if move.piece_captured:
+                move.order_score = MVV_LVA_SCORES[move.piece_captured][move.moving_piece]
+                captures.append(move)
+            else:
+                move_key = move.source_index | (move.destination_index << 7)
+                if move_key == killer_1 or move_key == killer_2:
+                    killers.append(move)
+                elif move_key == counter_move_key:
+                    counter_move = move
+                else:
+                    quiets.append(move)
+
+        # STAGE 2: captures, in MVV-LVA order
+        yield from best_first(captures)
+
+        # STAGE 3: quiet 'killer' moves
+        yield from killers
+
+        # STAGE 4: the quiet move that last refuted the move played into this node
+        if counter_move is not None:
+            yield counter_move
+
+        # STAGE 5: remaining quiets, history scores are only read once this stage is reached
+        if quiets:
+            history_table = self.history_table
+            for move in quiets:
+                move.order_score = history_table[move.source_index | (move.destination_index << 7)]
+            yield from best_first(quiets)
+
+    # returns the opening book's Move object for root_node if one applies, otherwise None
+    def find_book_move(self, root_node):
         book_move_uci = None
 
         # check opening book before searching, only within first 20 ply
@@ -93,6 +244,21 @@ class Search:
             legal_moves, _ = generate_moves(root_node) # get legal moves to find the book move's corresponding move object
             move_to_play = parse_user_move(book_move_uci, legal_moves) # get move object and convert to algebraic uci format
 
+            if move_to_play:
+                return move_to_play
+            
+            # safety check in case book is corrupted
+            print('Warning: book move was illegal, proceeding with search')
+
+        return None
+
+    # iterative deepening wrapper for search_root
+    # the search is negamax, so the side to move is read from root_node, color_to_play is kept for existing callers
+    # root_move_filter optionally restricts the root to a set of uci moves, used when one root is split across workers,
+    # the opening book is skipped in that case since the caller already consulted it
+    def find_best_move(self, root_node, color_to_play, time_limit=5, root_move_filter=None):
+        if root_move_filter is None:
+            move_to_play = self.find_book_move(root_node)
             if move_to_play:
                 return {
                     'move': move_to_play,
@@ -100,53 +266,78 @@ class Search:
                     'nodes': None,
                     'is_book': True,
                 }
-            else:
-                # safety check in case book is corrupted
-                print('Warning: book move was illegal, proceeding with search')
         
         # if no book move found, proceed with normal search
-        start_time = time.time()
+        start_time = time.monotonic()     # monotonic clock, immune to wall-clock adjustments mid-search
+        self.deadline = start_time + time_limit
         self.search_cycle += 1  # nodes from higher search cycles are prioritized during a TT collision
         self.nodes_searched = 0
         last_completed_depth = 0
         final_best_move = None
+        final_eval = None       # eval of the last completed depth, used to center aspiration windows
+        depth_results = []      # (best move, eval) of each completed depth, lets split root searches be compared
+        self.previous_pv = []
 
         # reset killer table and decay history table
-        self.killer_table = [[None, None] for _ in range(MAX_DEPTH + 1)]
-        for piece_type in range(12):
-            for square in range(120):
-                self.history_table[piece_type][square] //= 2    # divide all values by 2
+        self.killer_table = [0] * (2 * (MAX_DEPTH + 1))
+        self.history_table = [score // 2 for score in self.history_table]  # divide all values by 2
+
+        # make a copy of the board to search on, this prevents time cutoffs from corrupting the original board
+        # one copy serves every depth: a completed search unmakes all of its moves, and a time cutoff ends the search
+        search_board = root_node.copy()
+
+        # the root position is the same at every depth, so its move list is generated once and re-ranked per depth
+        root_moves, _ = generate_moves(search_board)
+        if root_move_filter is not None:
+            root_moves = [move for move in root_moves if move_to_algebraic(move) in root_move_filter]
 
         # use a try/catch block to catch TimeUp errors
         try:
             # iterative deepening loop, increments search depth until reaching max depth or time limit
             for depth in range(1, self.depth + 1):
-                # make a copy of the board to search on, this prevents time cutoffs from corrupting the original board
-                search_board = root_node.copy()
-                
                 self.max_q_depth = 0    # reset max quiescence depth at each iteration
 
                 # check time limit before initiating a new root search
-                if (time.time() - start_time) > time_limit:
+                if time.monotonic() >= self.deadline:
                     print(f'Time limit reached before depth {depth}, using last best move')
                     break
 
-                # search the best move at the loop's current depth
-                best_move_this_depth = self.search_root(
-                    search_board, 
-                    color_to_play, 
-                    -INFINITY, 
-                    INFINITY, 
-                    depth,
-                    time_limit,
-                    start_time,
-                    final_best_move # the best move from the last depth, used in root-level move-ordering
-                )
+                # aspiration windows: search a narrow window around the last depth's eval, widen on a fail-high / fail-low
+                if depth >= ASPIRATION_MIN_DEPTH and final_eval is not None:
+                    window_center = final_eval
+                    alpha_step = beta_step = 0
+                else:
+                    window_center = 0
+                    alpha_step = beta_step = len(ASPIRATION_WINDOWS) - 1     # full window
+
+                while True:
+                    alpha = max(-INFINITY, window_center - ASPIRATION_WINDOWS[alpha_step])
+                    beta = min(INFINITY, window_center + ASPIRATION_WINDOWS[beta_step])
+
+                    # search the best move at the loop's current depth
+                    best_move_this_depth, eval_this_depth = self.search_root(
+                        search_board, 
+                        alpha, 
+                        beta, 
+                        depth,
+                        final_best_move, # the best move from the last depth, used in root-level move-ordering
+                        root_moves,
+                    )
+
+                    if eval_this_depth <= alpha and alpha > -INFINITY:     # failed low, widen the lower bound
+                        alpha_step += 1
+                    elif eval_this_depth >= beta and beta < INFINITY:      # failed high, widen the upper bound
+                        beta_step += 1
+                    else:
+                        break
 
                 if best_move_this_depth is not None:
                     final_best_move = best_move_this_depth  # update overall best move to current depth's best move
+                    final_eval = eval_this_depth
                     last_completed_depth = depth
-                    time_elapsed = time.time() - start_time
+                    depth_results.append((final_best_move, final_eval))
+                    self.previous_pv = self.pv_table[0]   # seeds move-ordering along this line at the next depth
+                    time_elapsed = time.monotonic() - start_time
                     print(f'Depth {depth} completed in {time_elapsed:.2f}s')
                 else:
                     # if search was inconclusive, stop and use previous depth's best move
@@ -161,85 +352,135 @@ class Search:
             'depth': last_completed_depth,
             'nodes': self.nodes_searched,
             'is_book': False,
+            'depth_results': depth_results,
         }
 
-    # wrapper function for minimax, returns the move with the most favorable evaluation for the provided color_to_play
+    # wrapper function for minimax, returns the move with the most favorable evaluation for the side to move
+    # along with that move's evaluation (side-to-move relative), which find_best_move uses to center aspiration windows
     def search_root(
-        self, root_node, color_to_play, alpha = -INFINITY, beta = INFINITY, 
-        depth = 5, time_limit = None, start_time = None, best_move_last_depth = None
+        self, root_node, alpha = -INFINITY, beta = INFINITY, 
+        depth = 5, best_move_last_depth = None, root_moves = None
     ):    
         # SET UP INITIAL MINIMAX CALL
-        legal_moves, _ = generate_moves(root_node) # all legal moves
+        # find_best_move passes the same root move list at every depth, only a standalone call generates its own
+        if root_moves is None:
+            root_moves, _ = generate_moves(root_node)
+        legal_moves = root_moves
         best_move = None
-        killer_table = self.killer_table
-        history_table = self.history_table
+        best_eval = -INFINITY
+        pv_table = self.pv_table
+        pv_table[0] = []
             
         # sort legal moves based on move-ordering score in descending order
         # sorting priority: captures w/ MVV-LVA -> killer moves -> history table score
         # note: hash moves are not used at the root
-        legal_moves.sort(key=lambda move: self.score_move(move, depth), reverse=True)
+        legal_moves = self.order_moves(legal_moves, depth)
 
         # best move from last iterative-deepening depth always gets top priority
-        if best_move_last_depth in legal_moves:
+        # it comes from the same root move list, so it is moved to the front by identity
+        if best_move_last_depth is not None and best_move_last_depth in legal_moves:
             legal_moves.remove(best_move_last_depth)
-            legal_moves.insert(0, best_move_last_depth) # re-insert at the start of the move list
+            legal_moves.insert(0, best_move_last_depth)
 
-        # SET-UP MINIMAX RECURSION
-        # white to move
-        if color_to_play == 'white':
-            best_eval = -INFINITY
+        # the first root move is the previous depth's PV move, its subtree follows the rest of the previous line
+        self.follow_pv = len(self.previous_pv) > 0
 
-            for move in legal_moves:
-                root_node.make_move(move)
-                score = self.minimax(root_node, alpha, beta, 'black', depth - 1, time_limit, start_time, ply=0)
-                root_node.unmake_move(move)
+        # SET-UP MINIMAX RECURSION
+        for move in legal_moves:
+            root_node.make_move(move)
+            move_key = move.source_index | (move.destination_index << 7)
+            score = -self.minimax(root_node, -beta, -alpha, depth - 1, 0, move_key)
+            root_node.unmake_move(move)
+
+            # START: DEBUG BLOCK, UNCOMMENT TO DISPLAY DEBUG OUTPUT
+            # print(f"Move: {move_to_algebraic(move):<8} Score: {score:<8}")
+            # END: DEBUG BLOCK
+
+            if (score > best_eval):
+                best_eval = score
+                best_move = move
+
+            if score > alpha:   # new best line inside the window, extend the principal variation
+                alpha = score
+                pv_table[0] = [move] + pv_table[1]
+            if alpha >= beta:
+                break
+        
+        return best_move, best_eval
 
-                # START: DEBUG BLOCK FOR WHITE, UNCOMMENT TO DISPLAY DEBUG OUTPUT
-                # print(f"Move: {move_to_algebraic(move):<8} Score: {score:<8}")
-                # END: DEBUG BLOCK FOR WHITE
+    # recursive game search, negamax + alpha-beta pruning, initiated by search_root()
+    # scores are relative to the side to move: each child is searched with a negated, swapped window (-beta, -alpha)
+    # previous_move_key is the key of the move played into this node (0 after a null move), used for counter moves
+    # allow_null is False for the child of a null move, so two null moves are never made in a row
+    def minimax(self, current_position, alpha, beta, depth, ply, previous_move_key=0, allow_null=True):
+        self.nodes_searched += 1
 
-                if (score > best_eval):
-                    best_eval = score
-                    best_move = move
+        # reset this node's PV line, and pick up the previous depth's PV move if this node lies on that line
+        pv_table = self.pv_table
+        pv_table[ply + 1] = []
+        pv_move = None
+        if self.follow_pv:
+            self.follow_pv = False
+            if ply + 1 < len(self.previous_pv):
+                pv_move = self.previous_pv[ply + 1]
+
+        # check if time limit exceeded before searching, polled every 4096 nodes to keep the clock read off the hot path
+        if not (self.nodes_searched & 4095) and time.monotonic() >= self.deadline:
+            raise self.TimeUpError()
 
-                alpha = max(alpha, score)
-                if alpha >= beta:
-                    break
-        
-        # black to move
-        else:
-            best_eval = INFINITY
+        # BASE CASE 1: threefold repetitions
+        if current_position.is_repetition():
+            return 0
 
-            for move in legal_moves:
-                root_node.make_move(move)
-                score = self.minimax(root_node, alpha, beta, 'white', depth - 1, time_limit, start_time, ply=0)
-                root_node.unmake_move(move)
+        # a fifty move draw is only scored after move generation (checkmate takes priority), until then it keeps this
+        # node off the leaf fast path and the TT early returns, whose stored scores ignore the move counter
+        fifty_move_draw = current_position.fifty_move_criteria_met()
 
-                # START: DEBUG BLOCK FOR BLACK, UNCOMMENT TO DISPLAY DEBUG OUTPUT
-                # print(f"Move: {move_to_algebraic(move):<8} Score: {score:<8}")
-                # END: DEBUG BLOCK FOR BLACK
+        # leaf fast path: quiescence generates its own moves and scores mates / stalemates the same way, so a depth 0
+        # node hands over before generating
+        if depth == 0 and not fifty_move_draw:
+            return self.quiescence_search(current_position, alpha, beta, ply)
 
-                if (score < best_eval):
-                    best_eval = score
-                    best_move = move
+        original_alpha = alpha
 
-                beta = min(beta, score)
-                if beta <= alpha: 
-                    break
-        
-        return best_move
+        # before generating moves, perform a TT lookup, a usable stored score returns without any move generation
+        # mated / stalemated positions return before the TT write below, so a matching entry always has legal moves
+        # the hash list and bucket are bound once per node and reused by the TT write after the move loop
+        # the position may sit in either slot of its bucket, the depth-preferred slot is checked first
+        tt_hashes = self.tt_hashes
+        position_hash = current_position.zobrist_hash
+        depth_slot = (position_hash & self.tt_mask) << 1
+        if tt_hashes[depth_slot] == position_hash:
+            table_index = depth_slot
+        elif tt_hashes[depth_slot + 1] == position_hash:
+            table_index = depth_slot + 1
+        else:
+            table_index = -1
+        hash_move = None
+        tt_move = None      # the stored move for this position, kept by a fail-low TT write
 
-    # recursive game search, minimax + alpha-beta pruning, initiated by search_root()
-    def minimax(self, current_position, alpha, beta, color_to_play, depth, time_limit, start_time, ply):
-        # check if time limit exceeded before searching
-        if (time.time() - start_time) > time_limit:
-            raise self.TimeUpError()
+        # if an entry is found (the hash comparison above guards against index collisions), use it
+        if table_index >= 0:
+            stored_eval = self.tt_evals[table_index]
+            stored_flag = self.tt_flags[table_index]
 
-        self.nodes_searched += 1
+            # only use cached data from deeper or equivalent searches
+            if self.tt_depths[table_index] >= depth and not fifty_move_draw: 
+                # use cached evaluation to either narrow alpha-beta window or return a score directly
+                if stored_flag == TT_EXACT:
+                    return stored_eval
+                elif stored_flag == TT_LOWERBOUND:
+                    if stored_eval > alpha:
+                        alpha = stored_eval
+                elif stored_eval < beta:    # TT_UPPERBOUND
+                    beta = stored_eval
 
-        # BASE CASE 1: threefold repetitions
-        if current_position.is_repetition():
-            return 0
+                # if search window has now met the pruning condition -> prune this branch
+                if alpha >= beta:
+                    return stored_eval
+                
+            # retrieve the hash move regardless of depth
+            hash_move = tt_move = self.tt_moves[table_index]
 
         history_table = self.history_table
         killer_table = self.killer_table
@@ -250,492 +491,373 @@ class Search:
         # BASE CASE 2: checkmate, stalemate, fifty move rule
         if len(legal_moves) == 0:           # if no legal moves
             if check_count > 0:             # if king is in check, base case #1: it's checkmate
-                if current_position.color_to_play == 'white':
-                    return -99999 + ply   # white is checkmated, favorable eval for black 
-                elif current_position.color_to_play == 'black':
-                    return 99999 - ply    # black is checkmated, favorable eval for white
-                
-            elif check_count == 0:          # if no checks, base case #2: it's stalemate
+                return -MATE_SCORE + ply    # the side to move is checkmated, sooner mates score lower
+            else:                           # if no checks, base case #2: it's stalemate
                 return 0                    # stalemate eval
         
         # check for fifty move rule draws
-        if current_position.fifty_move_criteria_met():
+        if fifty_move_draw:
             return 0 # draw score
 
-        # if depth == 0, enter quiescence routine
-        if depth == 0:
-            return self.quiescence_search(current_position, alpha, beta, color_to_play, time_limit, start_time, ply)
-        
         # RECURSIVE CASE: 
         # futility pruning setup
         futility_enabled = False
         static_eval = 0
         if depth <= 2 and check_count == 0: # only allow futility pruning if no checks and depth is below 3
-            static_eval = evaluate_position(current_position)
+            static_eval = evaluate_relative(current_position)   # relative to the side to move
 
             # to prevent aggressive over-pruning in a won position, disable futility when above the win threshold
             won_position = abs(static_eval) > WIN_SCORE
 
-            # count material
-            material_count = 0
-            for piece in ['Q', 'R', 'N', 'B', 'q', 'r', 'n', 'b']:
-                if piece.lower() == 'q':
-                    material_count += len(current_position.piece_lists[piece]) * 4
-                elif piece.lower() == 'r':
-                    material_count += len(current_position.piece_lists[piece]) * 2
-                elif piece.lower() == 'n' or piece.lower() == 'b':
-                    material_count += len(current_position.piece_lists[piece])
-
-            # disable futility pruning near the end of the game
-            if material_count > 4 and not won_position:
+            # disable futility pruning near the end of the game, the board's incrementally kept game phase already
+            # counts non-pawn material with the same weights (queens = 4, rooks = 2, minor pieces = 1)
+            if current_position.game_phase > 4 and not won_position:
                 futility_enabled = True
 
-        original_alpha = alpha
-        original_beta = beta
+        # null-move pruning: at non-PV nodes (null window), pass the turn and run a reduced search
+        # if the side to move is still winning after giving the opponent a free move, prune this branch
+        # skipped in check, and when the side to move has only pawns left, where zugzwang makes the hypothesis unsafe
+        if allow_null and depth >= NULL_MOVE_MIN_DEPTH and check_count == 0 and beta - alpha == 1:
+            piece_lists = current_position.piece_lists
+            if current_position.color_to_play == WHITE:
+                has_pieces = piece_lists['N'] or piece_lists['B'] or piece_lists['R'] or piece_lists['Q']
+            else:
+                has_pieces = piece_lists['n'] or piece_lists['b'] or piece_lists['r'] or piece_lists['q']
 
-        # before searching, perform a TT lookup
-        position_hash = current_position.zobrist_hash
-        table_index = position_hash & (self.tt_size - 1)
-        tt_entry = self.transposition_table[table_index]
-        hash_move = None
+            if has_pieces:
+                reduction = NULL_MOVE_DEEP_REDUCTION if depth > 6 else NULL_MOVE_REDUCTION
+                null_state = current_position.make_null_move()
+                null_eval = -self.minimax(
+                    current_position, -beta, -beta + 1, depth - 1 - reduction, ply + 1, allow_null=False
+                )
+                current_position.unmake_null_move(null_state)
 
-        # if an entry is found, check hash to ensure it's not from a different position (via collisions)
-        if tt_entry and tt_entry['hash'] == position_hash:
-            # only use cached data from deeper or equivalent searches
-            if tt_entry['depth'] >= depth: 
-                stored_eval = tt_entry['eval']
-                stored_flag = tt_entry['flag']
+                if null_eval >= beta:
+                    return beta
 
-                # use cached evaluation to either narrow alpha-beta window or return a score directly
-                if stored_flag == 'EXACT':
-                    return stored_eval
-                elif stored_flag == 'LOWERBOUND':
-                    alpha = max(alpha, stored_eval)
-                elif stored_flag == 'UPPERBOUND':
-                    beta = min(beta, stored_eval)
+        # along the previous depth's PV, its move is tried first ahead of the hash move
+        if pv_move is not None:
+            hash_move = pv_move
 
-                # if search window has now met the pruning condition -> prune this branch
-                if alpha >= beta:
-                    return stored_eval
-                
-            # retrieve the hash move regardless of depth
-            if 'best_move' in tt_entry:
-                hash_move = tt_entry['best_move']
+        # internal iterative deepening: with no hash move at a deep PV node (open window), run a reduced-depth search 
+        # first, the best move it stores in the TT becomes the hash move for the real search, skipped in null windows
+        if hash_move is None and depth >= IID_MIN_DEPTH and beta - alpha > 1:
+            self.minimax(current_position, alpha, beta, depth - IID_REDUCTION, ply, previous_move_key)
 
-        # if TT didn't allow for an early return, proceed with the core search
-        # sort legal moves based on move-ordering score in descending order
-        # sorting priority: hash move -> captures w/ MVV-LVA -> killer moves -> history table score
-        legal_moves.sort(key=lambda move: self.score_move(move, depth, hash_move), reverse=True)
-
-        if color_to_play == 'white': # white to move
-            max_eval = -INFINITY
-            best_move = None         # track best move to store in TT for move-ordering
-
-            for move_index, move in enumerate(legal_moves):
-                # don't use LMR or futility on pawn pushes at or above the 6th rank
-                is_dangerous_pawn_push = (
-                    move.moving_piece == 'P' and 
-                    move.destination_index <= 48
-                )
+            # re-probe the TT for the move the reduced search stored
+            if tt_hashes[depth_slot] == position_hash:
+                hash_move = tt_move = self.tt_moves[depth_slot]
+            elif tt_hashes[depth_slot + 1] == position_hash:
+                hash_move = tt_move = self.tt_moves[depth_slot + 1]
 
-                # check if futility applies
-                if futility_enabled:
-                    if (
-                        (not move.piece_captured) 
-                        and (not move.promotion_piece)
-                        and (not is_dangerous_pawn_push)
-                    ):
-                        margin = FUTILITY_MARGINS[depth]
-
-                        # if current eval + safety margin still can't raise alpha
-                        if (static_eval + margin) <= alpha:
-                            continue # skip to next move
-
-                current_position.make_move(move)
-
-                # 1: full window (alpha, beta) search for the first move
-                if move_index == 0:
-                    returned_eval = self.minimax(
-                        current_position, 
-                        alpha, 
-                        beta, 
-                        'black', 
-                        depth - 1, 
-                        time_limit, 
-                        start_time,
-                        ply + 1,
-                    )
+        # if TT didn't allow for an early return, proceed with the core search
+        # moves are produced lazily in stages: hash move -> captures w/ MVV-LVA -> killer moves -> history table score
+        legal_moves = self.staged_moves(legal_moves, depth, hash_move, self.counter_moves[previous_move_key])
+
+        max_eval = -INFINITY
+        best_move = None         # track best move to store in TT for move-ordering
+
+        # per-node parts of the futility and LMR conditions, hoisted out of the move loop
+        futility_eval = static_eval + FUTILITY_MARGINS[depth] if futility_enabled else 0
+        lmr_enabled = depth >= 3 and check_count == 0
+
+        # bound methods used in the move loop, looked up once per node instead of once per move
+        minimax = self.minimax
+        make_move = current_position.make_move
+        unmake_move = current_position.unmake_move
+
+        for move_index, move in enumerate(legal_moves):
+            # only quiet moves may be futility pruned or reduced, decided once per move: not a capture, promotion,
+            # or pawn push at or beyond the 6th rank (3rd rank for black)
+            moving_piece = move.moving_piece
+            is_quiet = not (
+                move.piece_captured
+                or move.promotion_piece
+                or (moving_piece == 'P' and move.destination_index <= 48)
+                or (moving_piece == 'p' and move.destination_index >= 71)
+            )
+
+            # check if futility applies, if current eval + safety margin still can't raise alpha, skip to next move
+            if futility_enabled and is_quiet and futility_eval <= alpha:
+                continue
+
+            move_key = move.source_index | (move.destination_index << 7)
+            make_move(move)
+
+            # 1: full window (alpha, beta) search for the first move
+            if move_index == 0:
+                # only the PV move itself continues following the previous depth's line, not a sibling searched first
+                # because the PV move was pruned or missing, the child clears follow_pv on entry
+                if (
+                    pv_move is not None
+                    and move.source_index == pv_move.source_index
+                    and move.destination_index == pv_move.destination_index
+                    and move.promotion_piece == pv_move.promotion_piece
+                ):
+                    self.follow_pv = True
+                returned_eval = -minimax(current_position, -beta, -alpha, depth - 1, ply + 1, move_key)
+            
+            # 2: null window (alpha, alpha+1) search for all subsequent moves
+            else:
+                reduction = 0   # used in late-move reductions
                 
-                # 2: null window (alpha, alpha+1) search for all subsequent moves
-                else:
-                    reduction = 0   # used in late-move reductions
-                    
-                    # LMR conditions
-                    if (
-                        (depth >= 3)
-                        and (move_index >= 3) 
-                        and (not move.piece_captured) 
-                        and (not move.promotion_piece)
-                        and (check_count == 0)
-                        and (not is_dangerous_pawn_push)
-                    ):
-                        reduction = 1   # reduce depth for late moves
-
-                    # apply reduction (if any) to the search
-                    reduced_depth = depth - 1 - reduction
-
-                    returned_eval = self.minimax(
-                        current_position, 
-                        alpha, 
-                        alpha + 1, 
-                        'black', 
-                        reduced_depth, 
-                        time_limit, 
-                        start_time,
-                        ply + 1,
-                    )
+                # LMR conditions
+                if lmr_enabled and move_index >= 3 and is_quiet:
+                    reduction = 1   # reduce depth for late moves
 
-                    # 3: if null window search failed high, re-search with a full window to full depth
-                    if returned_eval > alpha and returned_eval < beta:
-                        returned_eval = self.minimax(
-                            current_position, 
-                            alpha, 
-                            beta, 
-                            'black', 
-                            depth - 1, 
-                            time_limit, 
-                            start_time,
-                            ply + 1,
-                        )
-
-                current_position.unmake_move(move)
-
-                if returned_eval > max_eval:
-                    max_eval = returned_eval
-                    best_move = move
-
-                alpha = max(alpha, returned_eval)
-
-                if alpha >= beta:   # beta cut-off, update killer and history tables, break
-                    if not move.piece_captured:     # if this was not a capture
-                        # shift over top two killer moves for this depth
-                        killer_table[depth][1] = killer_table[depth][0]
-                        killer_table[depth][0] = move
-
-                        # give a bonus of depth^2 to the this piece's history table destination square
-                        pc_type_index = HISTORY_OUTER_INDICES[move.moving_piece]
-                        dest = move.destination_index
-                        history_table[pc_type_index][dest] += depth * depth
-                    break
+                # apply reduction (if any) to the search
+                reduced_depth = depth - 1 - reduction
 
-            # after search completion, write results to transposition table
-            final_eval = max_eval
-            flag = ''
-            if final_eval >= beta:              # search failed-high -> beta cutoff
-                flag = 'LOWERBOUND'             # this node's true evaluation is at least final_eval
-            elif final_eval <= original_alpha:  # search failed-low -> could not raise alpha
-                flag = 'UPPERBOUND'             # this node's true evaluation is at most final_eval
-            else:
-                flag = 'EXACT'                  # final_score was within alpha-beta bounds
-
-            # TT replacement strategy
-            should_write = False
-            if tt_entry is None:  
-                # always write to empty slots
-                should_write = True     
-            elif tt_entry['age'] < self.search_cycle:
-                # existing entry is old, override it
-                should_write = True    
-            elif depth >= tt_entry['depth']:
-                # existing entry is from an equal or shallower depth, override it
-                should_write = True
-
-            if should_write:
-                new_entry = {
-                    'hash': position_hash,
-                    'eval': final_eval,
-                    'depth': depth,
-                    'flag': flag,
-                    'age': self.search_cycle,
-                }                
-                if best_move:
-                    new_entry['best_move'] = best_move
-
-                self.transposition_table[table_index] = new_entry
-
-            return final_eval
-
-        else: # black to move
-            min_eval = INFINITY
-            best_move = None     # track the best move to store in TT for move-ordering
-
-            for move_index, move in enumerate(legal_moves):
-                # don't use LMR or futility on pawn pushes at or below the 3rd rank
-                is_dangerous_pawn_push = (
-                    move.moving_piece == 'p' and
-                    move.destination_index >= 71
-                )
-                 
-                # check if futility pruning applies
-                if futility_enabled:
-                    if (
-                        (not move.piece_captured) 
-                        and (not move.promotion_piece)
-                        and (not is_dangerous_pawn_push)
-                    ):
-                        margin = FUTILITY_MARGINS[depth]
-
-                        # if current eval - safety margin still can't lower beta
-                        if (static_eval - margin) >= beta:
-                            continue # skip to next move
-
-                current_position.make_move(move)
-
-                # 1: full window (alpha, beta) search for the first move
-                if move_index == 0:
-                    returned_eval = self.minimax(
-                        current_position, 
-                        alpha, 
-                        beta, 
-                        'white', 
-                        depth - 1, 
-                        time_limit, 
-                        start_time,
-                        ply + 1,
-                    )
+                returned_eval = -minimax(current_position, -alpha - 1, -alpha, reduced_depth, ply + 1, move_key)
 
-                # 2: null window (beta - 1, beta) search for all subsequent moves
-                else:
-                    reduction = 0   # used in late-move reductions
-                    
-                    # LMR conditions
-                    if (
-                        (depth >= 3)
-                        and (move_index >= 3) 
-                        and (not move.piece_captured) 
-                        and (not move.promotion_piece)
-                        and (check_count == 0)
-                        and (not is_dangerous_pawn_push)
-                    ):
-                        reduction = 1   # reduce depth for late moves
-
-                    # apply reduction (if any) to the search
-                    reduced_depth = depth - 1 - reduction
-
-                    returned_eval = self.minimax(
-                        current_position, 
-                        beta - 1, 
-                        beta, 
-                        'white', 
-                        reduced_depth, 
-                        time_limit, 
-                        start_time,
-                        ply + 1,
-                    )
+                # 3: if null window search failed high, re-search with a full window to full depth
+                if returned_eval > alpha and returned_eval < beta:
+                    returned_eval = -minimax(current_position, -beta, -alpha, depth - 1, ply + 1, move_key)
 
-                    # 3: if null window search failed low, re-search with a full window to full depth
-                    if returned_eval < beta and returned_eval > alpha:
-                        returned_eval = self.minimax(
-                            current_position, 
-                            alpha, 
-                            beta, 
-                            'white', 
-                            depth - 1, 
-                            time_limit, 
-                            start_time,
-                            ply + 1,
-                        )
-
-                current_position.unmake_move(move)
-
-                if returned_eval < min_eval:
-                    min_eval = returned_eval
-                    best_move = move
-
-                beta = min(beta, returned_eval)
-
-                if beta <= alpha:   # alpha cut-off, update killer and history tables, break
-                    if not move.piece_captured:     # if this was not a capture
-                        # shift over top two killer moves for this depth
-                        killer_table[depth][1] = killer_table[depth][0]
-                        killer_table[depth][0] = move
-
-                        # give a bonus of depth^2 to the this piece's history table destination square
-                        pc_type_index = HISTORY_OUTER_INDICES[move.moving_piece]
-                        dest = move.destination_index
-                        history_table[pc_type_index][dest] += depth * depth
-                    break
-            
-            # after search completion, write results to transposition table
-            final_eval = min_eval
-            flag = ''
-            if final_eval <= alpha:                 # search failed-low -> alpha cutoff
-                flag = 'UPPERBOUND'                 # this node's true evaluation is at most final_eval
-            elif final_eval >= original_beta:       # search failed-high -> could not lower beta
-                flag = 'LOWERBOUND'                 # this node's true evaluation is at least final_eval
-            else:
-                flag = 'EXACT'                      # final score was within alpha-beta bounds
-
-            # TT replacement strategy
-            should_write = False
-            if tt_entry is None:
-                # always write to empty slots
-                should_write = True
-            elif tt_entry['age'] < self.search_cycle:
-                # existing entry is old, override it
-                should_write = True
-            elif depth >= tt_entry['depth']:
-                # existing entry is from an equal or shallower depth, override it
-                should_write = True
-
-            if should_write:
-                new_entry = {
-                    'hash': position_hash,
-                    'eval': final_eval,
-                    'depth': depth,
-                    'flag': flag,
-                    'age': self.search_cycle,
-                }
-                if best_move:
-                    new_entry['best_move'] = best_move
+            unmake_move(move)
 
-                self.transposition_table[table_index] = new_entry
-            
-            return final_eval
+            if returned_eval > max_eval:
+                max_eval = returned_eval
+                best_move = move
+
+            if returned_eval > alpha:   # new best line inside the window, extend the principal variation
+                alpha = returned_eval
+                pv_table[ply + 1] = [move] + pv_table[ply + 2]
+
+            if alpha >= beta:   # beta cut-off, update killer, counter-move and history tables, break
+                if not move.piece_captured:     # if this was not a capture
+                    # shift over top two killer moves for this depth, skip if it is already the first killer
+                    killer_slot = depth * 2
+                    if killer_table[killer_slot] != move_key:
+                        killer_table[killer_slot + 1] = killer_table[killer_slot]
+                        killer_table[killer_slot] = move_key
+
+                    # record this move as the refutation of the move played into this node
+                    if previous_move_key:
+                        self.counter_moves[previous_move_key] = move_key
+
+                    # give a bonus of depth^2 to this move's source / destination history entry
+                    history_table[move_key] += depth * depth
+                break
+
+        self.follow_pv = False
+
+        # after search completion, write results to transposition table
+        final_eval = max_eval
+        if final_eval >= beta:              # search failed-high -> beta cutoff
+            flag = TT_LOWERBOUND            # this node's true evaluation is at least final_eval
+        elif final_eval <= original_alpha:  # search failed-low -> could not raise alpha
+            flag = TT_UPPERBOUND            # this node's true evaluation is at most final_eval
+        else:
+            flag = TT_EXACT                 # final_score was within alpha-beta bounds
+
+        # TT replacement strategy, two slots per bucket, read as they are now, after the searches below this node
+        # the depth-preferred slot takes the entry if it is empty, from an earlier search (an empty slot's age of 0 is
+        # older than any search cycle), or from an equal or shallower depth, otherwise the always-replace slot takes it
+        # so a deep entry is never evicted by shallower ones, and the newest shallow result is still kept
+        search_cycle = self.search_cycle
+        if self.tt_ages[depth_slot] < search_cycle or depth >= self.tt_depths[depth_slot]:
+            table_index = depth_slot
+        else:
+            table_index = depth_slot + 1
+
+        # fail-low nodes have no reliable best move (every move scored at or below alpha), so an upper bound keeps
+        # the hash move already stored for this position, cutoff and exact nodes store the move they found
+        if flag == TT_UPPERBOUND and tt_move is not None:
+            best_move = tt_move
+
+        tt_hashes[table_index] = position_hash
+        self.tt_evals[table_index] = final_eval
+        self.tt_depths[table_index] = depth
+        self.tt_flags[table_index] = flag
+        self.tt_ages[table_index] = search_cycle
+        self.tt_moves[table_index] = best_move
+
+        return final_eval
 
     # extends search at minimax leaf nodes to mitigate the 'horizon effect', only considers captures / check escapes
-    # hard coded depth limit of 8 to lockdown any runaway recursions
+    # hard coded depth limit of 8 to lockdown any runaway recursions, scores are relative to the side to move
     def quiescence_search(
-        self, current_position, alpha, beta, color_to_play, 
-        time_limit, start_time, ply, q_depth=1, max_depth=8,
+        self, current_position, alpha, beta, 
+        ply, q_depth=1, max_depth=8,
     ):        
-        self.max_q_depth = max(self.max_q_depth, q_depth)
+        if q_depth > self.max_q_depth:
+            self.max_q_depth = q_depth
 
-        # before searching, check if time limit exceeded
-        if (time.time() - start_time) > time_limit:
-            raise self.TimeUpError()
-        
         self.nodes_searched += 1
 
+        # before searching, check if time limit exceeded, polled every 4096 nodes like in minimax
+        if not (self.nodes_searched & 4095) and time.monotonic() >= self.deadline:
+            raise self.TimeUpError()
+
         # STEP 1: BASE CASES & MOVE GENERATION
-        legal_moves, check_count = generate_moves(current_position)
+        # out of check only captures / promotions are searched, so quiet moves are normally not generated at all
+        # the exception is the horizon node (q_depth 1) when the side to move has only its king and pawns, where a
+        # stalemate is realistic, every move is generated there so that stalemates are still scored as draws
+        piece_lists = current_position.piece_lists
+        if current_position.color_to_play == WHITE:
+            has_pieces = piece_lists['N'] or piece_lists['B'] or piece_lists['R'] or piece_lists['Q']
+        else:
+            has_pieces = piece_lists['n'] or piece_lists['b'] or piece_lists['r'] or piece_lists['q']
+        full_generation = q_depth == 1 and not has_pieces
+
+        # out of check the stand pat is a valid score, so a node that fails high on it (or sits at the depth limit)
+        # returns before generating moves, only a cheap king attack test is needed to rule out a check
+        stand_pat_eval = None
+        if not full_generation and not in_check(current_position):
+            stand_pat_eval = evaluate_relative(current_position)
+            if stand_pat_eval >= beta or q_depth >= max_depth:
+                return stand_pat_eval
+
+        legal_moves, check_count = generate_moves(current_position, captures_only=not full_generation)
 
         # first base case: stalemates / checkmates, return eval if found
         if len(legal_moves) == 0:           # if no legal moves
             if check_count > 0:             # if king is in check, it's checkmate
-                if current_position.color_to_play == 'white':
-                    return -99999 + ply   # white is checkmated, favorable eval for black 
-                elif current_position.color_to_play == 'black':
-                    return 99999 - ply    # black is checkmated, favorable eval for white
-                
-            elif check_count == 0:          # if no checks, it's stalemate
+                return -MATE_SCORE + ply    # the side to move is checkmated
+            elif full_generation:           # if no checks, it's stalemate
                 return 0                    # stalemate eval
+            else:                           # no captures to search, return the final evaluation
+                return stand_pat_eval
         
-        # if there are no checks, filter out moves that are not captures or promotions
-        if check_count == 0:
+        # after a full generation, filter out moves that are not captures or promotions if there are no checks
+        if full_generation and check_count == 0:
             legal_moves = [move for move in legal_moves if move.piece_captured or move.promotion_piece]
             if not legal_moves: # if there are no legal non-captures, return the final evaluation
-                return evaluate_position(current_position)
+                return evaluate_relative(current_position)
 
         # second base case: hardcoded depth limit reached
         if q_depth >= max_depth: 
-            return evaluate_position(current_position)
+            return evaluate_relative(current_position)
 
         # STEP 2: "STAND-PAT" PRUNING
-        stand_pat_eval = evaluate_position(current_position)
-        if color_to_play == 'white':            # white to move
-            if stand_pat_eval >= beta:          # fail high, black has a better option
-                return stand_pat_eval
-            alpha = max(alpha, stand_pat_eval)  # update alpha if the stand pat eval improves on it
-        elif color_to_play == 'black':          # black to move
-            if stand_pat_eval <= alpha:         # fail low, white has a better option
-                return stand_pat_eval 
-            beta = min(beta, stand_pat_eval)    # update beta if the stand pat eval improves on it
+        if stand_pat_eval is None:
+            stand_pat_eval = evaluate_relative(current_position)
+        if stand_pat_eval >= beta:          # fail high, the opponent has a better option earlier in the tree
+            return stand_pat_eval
+        if stand_pat_eval > alpha:          # update alpha if the stand pat eval improves on it
+            alpha = stand_pat_eval
             
         # third base case: no captures / check evasion moves available
         if len(legal_moves) == 0:
             return stand_pat_eval
 
         # STEP 3: RECURSIVE CASE - SAME AS MINIMAX SEARCH, BUT SCOPE LIMITED TO CAPTURES / CHECK-EVASIONS ONLY
-        # move-ordering - sort captures using MVV-LVA
-        legal_moves.sort(key=lambda move: self.score_move(move, 0), reverse=True)
-
-        if color_to_play == 'white':
-            max_eval = stand_pat_eval
+        # move-ordering: out of check every move is a capture or promotion, sorted by MVV-LVA (quiet promotions last)
+        # without the killer / history lookups, check evasions include quiet moves and go through order_moves
+        if check_count == 0:
             for move in legal_moves:
-                # first run delta pruning check
-                if check_count == 0 and not move.promotion_piece: # cannot delta prune while in check
-                    attacker_value = PIECE_VALUES[move.moving_piece.lower()]
-                    victim_value = PIECE_VALUES[move.piece_captured.lower()]
-                    material_gain = (victim_value - attacker_value) * 100 # multiply by 100 for centipawn eval
-
-                    if stand_pat_eval + DELTA + material_gain < alpha:
-                        continue # prune
-
-                # if no delta prune, proceed
-                current_position.make_move(move)
-                returned_eval = self.quiescence_search(
-                    current_position, alpha, beta, 'black', 
-                    time_limit, start_time, ply+1, q_depth+1, max_depth
-                )
-                current_position.unmake_move(move)
+                piece_captured = move.piece_captured
+                move.order_score = MVV_LVA_SCORES[piece_captured][move.moving_piece] if piece_captured else 0
+            legal_moves.sort(key=ORDER_SCORE, reverse=True)
+        else:
+            legal_moves = self.order_moves(legal_moves, 0)
+
+        # bound methods used in the move loop, looked up once per node instead of once per move
+        quiescence_search = self.quiescence_search
+        make_move = current_position.make_move
+        unmake_move = current_position.unmake_move
+
+        # delta pruning cannot be applied while in check
+        # a capture gaining less than delta_floor cannot lift the stand pat above alpha, refreshed whenever alpha rises
+        delta_prune = check_count == 0
+        delta_floor = alpha - stand_pat_eval - DELTA
+
+        max_eval = stand_pat_eval
+        for move in legal_moves:
+            # first run delta pruning check
+            if delta_prune and not move.promotion_piece:
+                # already in centipawns
+                material_gain = PIECE_VALUES[ord(move.piece_captured)] - PIECE_VALUES[ord(move.moving_piece)]
+
+                if material_gain < delta_floor:
+                    continue # prune
+
+                # SEE pruning, skip captures that lose material once all recaptures are played out
+                # only a capture by a more valuable piece can come out behind, so the others skip the exchange scan
+                if material_gain < 0 and static_exchange_eval(current_position, move) < 0:
+                    continue # prune
+
+            # if no delta prune, proceed
+            make_move(move)
+            returned_eval = -quiescence_search(
+                current_position, -beta, -alpha, 
+                ply+1, q_depth+1, max_depth
+            )
+            unmake_move(move)
+
+            if returned_eval > max_eval:
+                max_eval = returned_eval
+                if returned_eval > alpha:
+                    alpha = returned_eval
+                    if alpha >= beta:
+                        return max_eval
+                    delta_floor = alpha - stand_pat_eval - DELTA
+            
+        return max_eval
+
+# computes the polyglot Zobrist key of a position, matching chess.polyglot.zobrist_hash for the same position
+def polyglot_hash(position):
+    key = 0
+    for piece, squares in position.piece_lists.items():
+        offset = POLYGLOT_PIECE_OFFSETS[piece]
+        for index in squares:
+            key ^= POLYGLOT_RANDOM_ARRAY[offset + POLYGLOT_SQUARES[index]]
+
+    if position.white_castle_kingside: key ^= POLYGLOT_RANDOM_ARRAY[768]
+    if position.white_castle_queenside: key ^= POLYGLOT_RANDOM_ARRAY[769]
+    if position.black_castle_kingside: key ^= POLYGLOT_RANDOM_ARRAY[770]
+    if position.black_castle_queenside: key ^= POLYGLOT_RANDOM_ARRAY[771]
+
+    # the en passant file is only hashed when a pawn of the side to move stands ready to capture on it
+    ep_square = position.en_passant_square
+    if ep_square:
+        if position.color_to_play == WHITE:
+            pawn, pawn_row = 'P', ep_square + 10
+        else:
+            pawn, pawn_row = 'p', ep_square - 10
+        board = position.board
+        if board[pawn_row - 1] == pawn or board[pawn_row + 1] == pawn:
+            key ^= POLYGLOT_RANDOM_ARRAY[772 + ep_square % 10 - 1]
 
-                max_eval = max(max_eval, returned_eval)
-                alpha = max(alpha, returned_eval)
+    if position.color_to_play == WHITE:
+        key ^= POLYGLOT_RANDOM_ARRAY[780]
 
-                if alpha >= beta:
-                    return max_eval
-                
-            return max_eval
+    return key
 
-        elif color_to_play == 'black':
-            min_eval = stand_pat_eval
-            for move in legal_moves:
-                # first run delta pruning check
-                if check_count == 0 and not move.promotion_piece: # cannot delta prune while in check
-                    attacker_value = PIECE_VALUES[move.moving_piece.lower()]
-                    victim_value = PIECE_VALUES[move.piece_captured.lower()]
-                    material_gain = (victim_value - attacker_value) * 100 # multiply by 100 for centipawn eval
-
-                    if stand_pat_eval - DELTA - material_gain > beta:
-                        continue # prune
-
-                # if no delta prune, proceed
-                current_position.make_move(move)
-                returned_eval = self.quiescence_search(
-                    current_position, alpha, beta, 'white', 
-                    time_limit, start_time, ply+1, q_depth+1, max_depth
-                )
-                current_position.unmake_move(move)
+# opening book readers, memory-mapped once per process and reused for every lookup, None if the file is missing
+_book_readers = {}
 
-                min_eval = min(min_eval, returned_eval)
-                beta = min(beta, returned_eval)
+# returns the memory-mapped reader for a book, opening it on first use
+# a server process calls this before starting its workers, so forked workers inherit the one mapping
+def open_book(book_path='book.bin'):
+    if book_path not in _book_readers:
+        try:
+            _book_readers[book_path] = chess.polyglot.MemoryMappedReader(book_path)
+        except FileNotFoundError:
+            print(f'Error: opening book file not found at {book_path}')
+            _book_readers[book_path] = None
 
-                if beta <= alpha:
-                    return min_eval
-                
-            return min_eval
+    return _book_readers[book_path]
 
 # helper function, retreives a random move from the opening book if available
 # returns the book move in UCI format if found, otherwise None
 def get_book_move(position, book_path='book.bin'):
-    try:
-        with chess.polyglot.open_reader(book_path) as reader:
-            fen = board_to_fen(position) # convert the board representation to fen format
-            board = chess.Board(fen)     # create a python-chess board using the fen
-
-            # get all book moves for the position
-            entries = list(reader.find_all(board))
-            if not entries:
-                return None
-
-            # weighted random choice based on entry weights
-            moves = [entry.move for entry in entries]
-            weights = [entry.weight for entry in entries]
-            book_move = random.choices(moves, weights=weights, k=1)[0]
-            return book_move.uci()
-
-    except (FileNotFoundError):
-        print(f'Error: opening book file not found at {book_path}')
-    except (IndexError):
-        return None # an IndexError means the position was not found in the book
\ No newline at end of file
+    reader = open_book(book_path)
+    if reader is None:
+        return None
+
+    # get all book moves for the position, looked up by key (binary search over the sorted book entries)
+    entries = list(reader.find_all(polyglot_hash(position)))
+    if not entries:
+        return None
+
+    # weighted random choice based on entry weights
+    moves = [entry.move.uci() for entry in entries]
+    weights = [entry.weight for entry in entries]
+    book_move = random.choices(moves, weights=weights, k=1)[0]
+
+    # castling entries are only remapped when a king actually stands on its start square
+    if book_move in POLYGLOT_CASTLES and position.board[ALGEBRAIC_TO_INDEX[book_move[:2]]] in 'Kk':
+        book_move = POLYGLOT_CASTLES[book_move]
+    return book_move
@@ -2,12 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from routers import game_router
 from services import game_service
+import engine
 from contextlib import asynccontextmanager
 import multiprocessing
 import os
 import threading
 import time
-import uuid
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -15,72 +15,125 @@ load_dotenv()
 # --- constants ---
 NUM_WORKERS = int(os.getenv('NUM_WORKERS', '8'))     # the number of engine instances
 MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '8'))   # concurrent session cap  
+PIN_WORKERS = os.getenv('PIN_WORKERS', '0') == '1'  # opt-in: pin each worker to its own core (Linux only)
 PRUNE_INTERVAL = 300    # 5 minutes
 WORKER_TIMEOUT = 10     # time for workers to respond to prune task
 
+def physical_core_order():
+    """
+    Lists the CPUs this process may run on, one thread of every physical core first, then the SMT siblings.
+    Read from the Linux sysfs topology, returns an empty list if it is unavailable.
+    """
+
+    try:
+        available_cpus = sorted(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity is Linux only
+        return []
+
+    first_threads = []
+    siblings = []
+    seen_cores = set()
+    for cpu in available_cpus:
+        try:
+            with open(f'/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list') as f:
+                core = f.read().strip()     # identical for every thread of a physical core
+        except OSError:
+            return []
+        
+        if core in seen_cores:
+            siblings.append(cpu)
+        else:
+            seen_cores.add(core)
+            first_threads.append(cpu)
+
+    return first_threads + siblings
+
 def trigger_prune(app_state):
     """Dispatches a prune task to all workers and updates global state."""
 
     print('Background task: starting periodic session prune...')
 
     # unpack the necessary shared state objects
-    session_count = app_state.session_count
+    session_map = app_state.session_map
     worker_load = app_state.worker_load
+    load_heap = app_state.load_heap
     task_queues = app_state.task_queues
-    results_dict = app_state.results_dict
+    pending_results = app_state.pending_results
     session_count_lock = app_state.session_count_lock
 
-    # dispatch a 'prune_sessions' task to all workers
-    prune_task_ids = {}
+    # dispatch a 'prune_sessions' task to all workers, registering each result slot before sending
+    # this runs on the pruning thread, so each slot is an [Event, result] pair filled in by the listener's callback
+    prune_tasks = {}    # map worker_id to its (task_id, result_slot)
     for i in range(NUM_WORKERS):
-        task_id = uuid.uuid4().hex
-        prune_task_ids[i] = task_id
-        task_queues[i].put((task_id, 'prune_sessions', {}))
-
-    # wait for all workers to respond
-    pruned_counts = {}  # map worker_id to its pruned_count
-    start_time = time.time()
-    while len(pruned_counts) < NUM_WORKERS:
-        if time.time() - start_time > WORKER_TIMEOUT:
-            print('Timed out waiting for workers to prune')
-            return
-        
-        # check for results from workers that haven't responded yet
-        for worker_id, task_id in prune_task_ids.items():
-            if worker_id not in pruned_counts and task_id in results_dict:
-                status, result_data = results_dict.pop(task_id)
-
-                if status == 'ok':
-                    pruned_counts[worker_id] = result_data
-                else:
-                    # if a worker fails, assume it pruned 0
-                    pruned_counts[worker_id] = 0
-
-        time.sleep(0.01)
+        task_id = game_router.new_task_id()
+        result_slot = [threading.Event(), None]
+        pending_results[task_id] = lambda result, result_slot=result_slot: _fill_result_slot(result_slot, result)
+        prune_tasks[i] = (task_id, result_slot)
+        task_queues[i].put((task_id, 'prune_sessions', {}, time.time() + WORKER_TIMEOUT))
+
+    # wait for all workers to respond, sharing one deadline across all of them
+    # sessions pruned by the workers that did answer are still released if another worker times out
+    pruned_ids = {}  # map worker_id to its list of pruned game ids
+    deadline = time.monotonic() + WORKER_TIMEOUT
+    try:
+        for worker_id, (task_id, result_slot) in prune_tasks.items():
+            # once the deadline has passed this becomes wait(0), which still picks up results that already arrived
+            if not result_slot[0].wait(max(0, deadline - time.monotonic())):
+                print(f'Timed out waiting for worker {worker_id} to prune')
+                continue
+            
+            status, result_data = result_slot[1]
+            if status == 'ok':
+                pruned_ids[worker_id] = result_data
+            else:
+                # if a worker fails, assume it pruned nothing
+                pruned_ids[worker_id] = []
+    finally:
+        for task_id, _ in prune_tasks.values():
+            pending_results.pop(task_id, None)
 
     # atomically update global counters
     total_pruned = 0
     with session_count_lock:
-        for worker_id, count in pruned_counts.items():
-            if count > 0:
-                worker_load[worker_id] -= count
-
-                # ensure worker_load can never go below 0
-                if worker_load[worker_id] < 0:
-                    worker_load[worker_id] = 0
+        for worker_id, game_ids in pruned_ids.items():
+            # only count sessions still mapped to this worker, one closed by its client was already released
+            count = 0
+            for game_id in game_ids:
+                if session_map.get(game_id) == worker_id:
+                    del session_map[game_id]
+                    count += 1
 
+            if count > 0:
+                # worker_load never goes below 0
+                game_router.release_worker_load(worker_load, load_heap, worker_id, count)
                 total_pruned += count
         
         # decrement global sessions count
-        session_count.value -= total_pruned
-        if session_count.value < 0:
-            session_count.value = 0
+        app_state.session_count = max(0, app_state.session_count - total_pruned)
 
         if total_pruned > 0:
             print(f'Background task: Pruned {total_pruned} inactive session(s)')
         else:
             print('No inactive sessions to prune')
 
+def _fill_result_slot(result_slot, result):
+    result_slot[1] = result
+    result_slot[0].set()
+
+def run_result_listener(result_queue, pending_results):
+    """Routes worker results from the shared result queue to the callback registered for each task."""
+
+    while True:
+        message = result_queue.get()
+        if message is None:     # shutdown sentinel
+            break
+
+        # results for timed-out or fire-and-forget tasks have no registered callback and are dropped
+        task_id, status, result_data = message
+        deliver = pending_results.get(task_id)
+        if deliver is not None:
+            deliver((status, result_data))
+
 def run_periodic_pruning(app_state, shutdown_event):
     """Runs in background at a 5-minute interval, triggers session pruning task dispatch."""
 
@@ -92,27 +145,42 @@ def run_periodic_pruning(app_state, shutdown_event):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    manager = multiprocessing.Manager()
-
     # --- create shared state / communication objects ---
-    app.state.results_dict = manager.dict()          # where workers put their results
-    app.state.session_map = manager.dict()           # maps session_ids to their assigned worker
-    app.state.session_count = manager.Value('i', 0)  # tracks global session count
-    app.state.session_count_lock = manager.Lock()
+    # workers put their results on one plain queue instead of a manager dict, a listener thread in this process
+    # hands each result to the callback registered under its task_id, which wakes the waiting request or thread
+    # a SimpleQueue writes straight to the pipe, without the feeder thread a Queue starts in every worker
+    result_queue = multiprocessing.SimpleQueue()
+    app.state.pending_results = {}
+
+    # session bookkeeping is only read and written by this process's request and pruning threads, never by the
+    # workers, so it lives in local memory guarded by a thread lock instead of behind Manager proxies
+    app.state.session_map = {}                                           # maps session_ids to their assigned worker
+    app.state.session_count = 0                                          # tracks global session count
+    app.state.session_count_lock = threading.Lock()
 
     # tracks num. of active games on each worker
-    app.state.worker_load = manager.list([0] * NUM_WORKERS)
+    app.state.worker_load = [0] * NUM_WORKERS
+
+    # min-heap of (load, worker_id) entries, new games go to the least-loaded worker without scanning worker_load
+    app.state.load_heap = [(0, i) for i in range(NUM_WORKERS)]
 
     # list of queues, one for each worker to receives tasks on
     task_queues = [multiprocessing.Queue() for _ in range(NUM_WORKERS)]
     app.state.task_queues = task_queues
 
+    # map the opening book before forking, workers started with fork share this mapping instead of opening their own
+    engine.open_book()
+
     # --- create and start worker processes ---
+    # workers fill physical cores before SMT siblings, so two searches only share a core once every core is busy
+    # the dispatcher process is left unpinned
+    core_order = physical_core_order() if PIN_WORKERS else []
     workers = []
     for i in range(NUM_WORKERS):
+        cpu = core_order[i % len(core_order)] if core_order else None
         process = multiprocessing.Process(
             target=game_service.run_worker,
-            args=(task_queues[i], app.state.results_dict),
+            args=(task_queues[i], result_queue, cpu),
             daemon=True
         )
         workers.append(process)
@@ -121,6 +189,14 @@ async def lifespan(app: FastAPI):
     app.state.workers = workers
     print(f'{NUM_WORKERS} chess worker processes started')
 
+    # --- start result listener thread ---
+    result_thread = threading.Thread(
+        target=run_result_listener,
+        args=(result_queue, app.state.pending_results),
+        daemon=True,
+    )
+    result_thread.start()
+
     # --- start background pruning thread ---
     shutdown_event = threading.Event()
     pruning_thread = threading.Thread(
@@ -138,7 +214,7 @@ async def lifespan(app: FastAPI):
     # --- shutdown logic ---
     print('Server is shutting down...')
     shutdown_event.set() # signal for pruning thread to stop
-    manager.shutdown()
+    result_queue.put(None) # signal for result listener thread to stop
     print('Server shutdown complete')
 
 app = FastAPI(lifespan=lifespan)
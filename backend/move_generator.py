@@ -1,5 +1,7 @@
 import board
 from board import Board, Move
+from utils import WHITE, BLACK
+from piece_square_tables import PIECE_MATERIAL
 
 # global empty square and out-of-bounds square constants
 EMPTY = '#'
@@ -40,15 +42,60 @@ BLACK_PAWN_DELTAS = {
     'advances': [10, 20]
 }
 
+# on-board target squares of a knight / king on each of the 120 indexes, built once at import so move generation
+# and the threat map skip the out-of-bounds checks, forked workers share these tables with the dispatcher
+def _on_board(index):
+    return 21 <= index <= 98 and 1 <= index % 10 <= 8
+
+KNIGHT_TARGETS = [
+    tuple(index + delta for delta in KNIGHT_DELTAS if _on_board(index + delta)) if _on_board(index) else ()
+    for index in range(120)
+]
+KING_TARGETS = [
+    tuple(index + delta for delta in KING_DELTAS if _on_board(index + delta)) if _on_board(index) else ()
+    for index in range(120)
+]
+
+# per-color move generation constants, built once here instead of on every generate_moves() call
+WHITE_PROMOTION_SQUARES = [21, 22, 23, 24, 25, 26, 27, 28]
+BLACK_PROMOTION_SQUARES = [91, 92, 93, 94, 95, 96, 97, 98]
+WHITE_PROMOTION_PIECES = ['B', 'N', 'R', 'Q']
+BLACK_PROMOTION_PIECES = ['b', 'n', 'r', 'q']
+WHITE_KINGSIDE_CASTLE_PATH = [96, 97]
+BLACK_KINGSIDE_CASTLE_PATH = [26, 27]
+WHITE_QUEENSIDE_CASTLE_PATH = [92, 93, 94]          # b1, c1, and d1 have to be empty
+BLACK_QUEENSIDE_CASTLE_PATH = [22, 23, 24]          # b8, c8, and d8 have to be empty
+WHITE_QUEENSIDE_KING_CASTLE_PATH = [93, 94]         # king path stops a c1
+BLACK_QUEENSIDE_KING_CASTLE_PATH = [23, 24]         # king path stops at c8
+
+# enemy sliders that can attack along each ray type, used by get_checks_and_pins()
+WHITE_ORTHOGONAL_SLIDERS = ['R', 'Q']
+WHITE_DIAGONAL_SLIDERS = ['B', 'Q']
+BLACK_ORTHOGONAL_SLIDERS = ['r', 'q']
+BLACK_DIAGONAL_SLIDERS = ['b', 'q']
+
+# static exchange evaluation constants, material values for both colors and the single-step ray directions
+SEE_PIECE_VALUES = {piece: value for piece_type, value in PIECE_MATERIAL.items() for piece in (piece_type, piece_type.lower())}
+DIAGONAL_STEPS = [-9, -11, 9, 11]
+ORTHOGONAL_STEPS = [-10, 10, -1, 1]
+
+# single-step rays for captures-only generation, in the same direction order as ROOK_DELTAS / BISHOP_DELTAS
+# so captures come out in the same order as from a full generation
+ROOK_STEPS = [-10, 10, 1, -1]
+BISHOP_STEPS = [-9, -11, 11, 9]
+QUEEN_STEPS = ROOK_STEPS + BISHOP_STEPS
+
 # generates all legal moves for a position, "position" is a "Board" object
-def generate_moves(position):
+# with captures_only (used by quiescence search), quiet moves are skipped before validation and only captures,
+# promotions and en passant captures are returned, unless the side to move is in check, then all evasions are returned
+def generate_moves(position, captures_only=False):
     legal_moves = []        # initialize the final array of legal moves to return later
     board = position.board
     piece_lists = position.piece_lists
     
     # define variables used in move generation logic
-    if (position.color_to_play == 'white'):
-        enemy_color = 'black'
+    if (position.color_to_play == WHITE):
+        enemy_color = BLACK
         friendly_king = 'K'
         friendly_knight = 'N'
         friendly_bishop = 'B'
@@ -59,18 +106,18 @@ def generate_moves(position):
         friendly_pieces = WHITE_PIECES
         enemy_pieces = BLACK_PIECES
         pawn_deltas = WHITE_PAWN_DELTAS
-        promotion_squares = [21, 22, 23, 24, 25, 26, 27, 28]
-        promotion_pieces = ['B', 'N', 'R', 'Q']
+        promotion_squares = WHITE_PROMOTION_SQUARES
+        promotion_pieces = WHITE_PROMOTION_PIECES
         castle_kingside = position.white_castle_kingside
         castle_queenside = position.white_castle_queenside
-        kingside_castle_path = [96, 97]
-        queenside_castle_path = [92, 93, 94]        # b1, c1, and d1 have to be empty
-        queenside_king_castle_path = [93, 94]       # king path stops a c1
+        kingside_castle_path = WHITE_KINGSIDE_CASTLE_PATH
+        queenside_castle_path = WHITE_QUEENSIDE_CASTLE_PATH
+        queenside_king_castle_path = WHITE_QUEENSIDE_KING_CASTLE_PATH
         castle_kingside_destination = 97
         castle_queenside_destination = 93
         king_home_square = 95
     else:
-        enemy_color = 'white'
+        enemy_color = WHITE
         friendly_king = 'k'
         friendly_knight = 'n'
         friendly_bishop = 'b'
@@ -81,13 +128,13 @@ def generate_moves(position):
         friendly_pieces = BLACK_PIECES
         enemy_pieces = WHITE_PIECES
         pawn_deltas = BLACK_PAWN_DELTAS
-        promotion_squares = [91, 92, 93, 94, 95, 96, 97, 98]
-        promotion_pieces = ['b', 'n', 'r', 'q']
+        promotion_squares = BLACK_PROMOTION_SQUARES
+        promotion_pieces = BLACK_PROMOTION_PIECES
         castle_kingside = position.black_castle_kingside
         castle_queenside = position.black_castle_queenside
-        kingside_castle_path = [26, 27]
-        queenside_castle_path = [22, 23, 24]       # b8, c8, and d8 have to be empty
-        queenside_king_castle_path = [23, 24]      # king path stops at c8
+        kingside_castle_path = BLACK_KINGSIDE_CASTLE_PATH
+        queenside_castle_path = BLACK_QUEENSIDE_CASTLE_PATH
+        queenside_king_castle_path = BLACK_QUEENSIDE_KING_CASTLE_PATH
         castle_kingside_destination = 27
         castle_queenside_destination = 23
         king_home_square = 25
@@ -95,6 +142,8 @@ def generate_moves(position):
     # get array of enemy-controlled squares and the number of checks in the position
     threat_map, check_count = get_threat_map(position, enemy_color)
     king_index = piece_lists[friendly_king][0]
+    if check_count > 0:
+        captures_only = False   # every evasion is needed to tell a checkmate apart from a check
 
     if check_count < 2:     # if not a double check
         checks, pins = get_checks_and_pins(position, king_index)    # arrays of check and pin dicts
@@ -119,8 +168,20 @@ def generate_moves(position):
 
         for piece in friendly_pieces:
             for index in piece_lists[piece]:
-                # get pseudo-legal moves, each array includes all pseudo-legal destination squares                      
-                if piece == friendly_knight:
+                # get pseudo-legal moves, each array includes all pseudo-legal destination squares
+                # with captures_only, pieces other than pawns only collect the occupied squares they attack
+                if captures_only and piece != friendly_pawn:
+                    if piece == friendly_knight:
+                        pseudo_legal_moves = non_sliding_captures(board, KNIGHT_TARGETS[index])
+                    elif piece == friendly_bishop:
+                        pseudo_legal_moves = sliding_captures(board, index, BISHOP_STEPS)
+                    elif piece == friendly_rook:
+                        pseudo_legal_moves = sliding_captures(board, index, ROOK_STEPS)
+                    elif piece == friendly_queen:
+                        pseudo_legal_moves = sliding_captures(board, index, QUEEN_STEPS)
+                    else:
+                        pseudo_legal_moves = non_sliding_captures(board, KING_TARGETS[index])
+                elif piece == friendly_knight:
                     pseudo_legal_moves = knight_moves(position, index)
                 elif piece == friendly_bishop:
                     pseudo_legal_moves = bishop_moves(position, index)
@@ -131,7 +192,7 @@ def generate_moves(position):
                 elif piece == friendly_king:
                     pseudo_legal_moves = king_moves(position, index)
                 elif piece == friendly_pawn:
-                    if (position.color_to_play == 'white'):
+                    if (position.color_to_play == WHITE):
                         pawn_moves_dict = white_pawn_moves(position, index)
                     else:
                         pawn_moves_dict = black_pawn_moves(position, index)
@@ -145,6 +206,12 @@ def generate_moves(position):
 
                 # VALIDATION STEP: loop through pseudo-legal moves
                 for destination in pseudo_legal_moves:
+                    if captures_only and board[destination] == EMPTY:         # skip quiet moves before validating them
+                        if not (piece == friendly_pawn and (
+                            destination in promotion_squares or destination == position.en_passant_square
+                        )):
+                            continue
+
                     if is_check:                                              # first round of filtering: checks
                         if piece != friendly_king:                            # if this is not a king
                             if not check['is_sliding']:                       # non-sliding checks must be captured
@@ -197,7 +264,7 @@ def generate_moves(position):
                         
                         # create legal Move object and append it to legal_moves
                         legal_move = Move(
-                            position, moving_piece, source_index, destination_index,
+                            moving_piece, source_index, destination_index,
                             piece_captured, is_en_passant, is_castle
                         )
                         legal_moves.append(legal_move)
@@ -214,7 +281,7 @@ def generate_moves(position):
                             
                             # create legal Move object and append it to legal moves
                             legal_move = Move(
-                                position, moving_piece, source_index, destination_index,
+                                moving_piece, source_index, destination_index,
                                 piece_captured, is_en_passant, is_castle
                             )
                             legal_moves.append(legal_move)
@@ -233,7 +300,7 @@ def generate_moves(position):
 
                                 # create legal Move object and append it to legal_moves
                                 legal_move = Move(
-                                    position, moving_piece, source_index, destination_index,
+                                    moving_piece, source_index, destination_index,
                                     piece_captured, is_en_passant, is_castle, promotion_piece
                                 )
                                 legal_moves.append(legal_move)
@@ -251,13 +318,13 @@ def generate_moves(position):
                         
                             # create legal Move object and append it to legal_moves
                             legal_move = Move(
-                                position, moving_piece, source_index, destination_index,
+                                moving_piece, source_index, destination_index,
                                 piece_captured, is_en_passant, is_castle
                             )
                             legal_moves.append(legal_move)
 
         # manually generate castling moves:
-        if castle_kingside:                                 # if kingside castling flag is True
+        if castle_kingside and not captures_only:           # if kingside castling flag is True
             if not is_check:                                # cannot castle when in check
                 castle_path_clear = True
                 for index in kingside_castle_path:          # loop through f1 and g1 (white) / f8 and g8 (black)
@@ -277,12 +344,12 @@ def generate_moves(position):
 
                     # create legal Move object and append it to legal_moves
                     legal_move = Move(
-                        position, moving_piece, source_index, destination_index, 
+                        moving_piece, source_index, destination_index, 
                         piece_captured, is_en_passant, is_castle
                     )
                     legal_moves.append(legal_move)
 
-        if castle_queenside:                                # if queenside castling flag is True
+        if castle_queenside and not captures_only:          # if queenside castling flag is True
             if not is_check:                                # cannot castle when in check
                 castle_path_clear = True
                 for index in queenside_castle_path:         # loop through b1, c1, and d1 (white) / b8, c8, and d8 (black)
@@ -303,7 +370,7 @@ def generate_moves(position):
                     
                     # create legal Move object and append it to legal_moves
                     legal_move = Move(
-                        position, moving_piece, source_index, destination_index, 
+                        moving_piece, source_index, destination_index, 
                         piece_captured, is_en_passant, is_castle
                     )
                     legal_moves.append(legal_move)
@@ -329,7 +396,7 @@ def generate_moves(position):
 
             # create legal Move object and append it to legal Moves
             legal_move = Move(
-                position, moving_piece, source_index, destination_index, 
+                moving_piece, source_index, destination_index, 
                 piece_captured, is_en_passant, is_castle
             )
             legal_moves.append(legal_move)
@@ -345,7 +412,7 @@ def get_threat_map(position, enemy_color):
     board = position.board
     piece_lists = position.piece_lists
 
-    if enemy_color == 'white':
+    if enemy_color == WHITE:
         enemy_pieces = WHITE_PIECES
         friendly_king = 'k'
         enemy_pawn_deltas = WHITE_PAWN_DELTAS
@@ -358,26 +425,22 @@ def get_threat_map(position, enemy_color):
     friendly_king_index = piece_lists[friendly_king][0] if piece_lists[friendly_king] else -1
 
     for piece_char in enemy_pieces:
+        piece_type = piece_char.lower()                             # convert all to lowercase to unify white / black logic
         for index in piece_lists[piece_char]:
-            piece_type = piece_char.lower()                         # convert all to lowercase to unify white / black logic
 
             # NON-SLIDING PIECES:
             if piece_type == 'n':                                   # if enemy knight
-                for delta in KNIGHT_DELTAS:
-                    target_index = index + delta
-                    if board[target_index] != OUT_OF_BOUNDS:        
-                        threat_map.add(target_index)                # add to the threat map
-                        if target_index == friendly_king_index:     # if the friendly king
-                            check_count += 1
+                for target_index in KNIGHT_TARGETS[index]:
+                    threat_map.add(target_index)                    # add to the threat map
+                    if target_index == friendly_king_index:         # if the friendly king
+                        check_count += 1
                 continue                                            # skip sliding piece logic below
             
             elif piece_type == 'k':                                 # if enemy king
-                for delta in KING_DELTAS:
-                    target_index = index + delta
-                    if board[target_index] != OUT_OF_BOUNDS:
-                        threat_map.add(target_index)                # add to the threat map
-                        if target_index == friendly_king_index:     # if the friendly king
-                            check_count += 1
+                for target_index in KING_TARGETS[index]:
+                    threat_map.add(target_index)                    # add to the threat map
+                    if target_index == friendly_king_index:         # if the friendly king
+                        check_count += 1
                 continue                                            # skip sliding piece logic below
             
             elif piece_type == 'p':                                 # if enemy pawn
@@ -426,19 +489,19 @@ def get_checks_and_pins(position, source_index):
     pins = []   # contains dicts of this position's pins
 
     # define friendly/enemy piece constants for white and black
-    if position.color_to_play == 'white':
+    if position.color_to_play == WHITE:
         friendly_pieces = WHITE_PIECES
         enemy_pieces = BLACK_PIECES
-        enemy_orthogonal = ['r', 'q']
-        enemy_diagonal = ['b', 'q']
+        enemy_orthogonal = BLACK_ORTHOGONAL_SLIDERS
+        enemy_diagonal = BLACK_DIAGONAL_SLIDERS
         enemy_pawn = 'p'
         enemy_knight = 'n'
         pawn_deltas = WHITE_PAWN_DELTAS['attacks']
     else:
         friendly_pieces = BLACK_PIECES
         enemy_pieces = WHITE_PIECES
-        enemy_orthogonal = ['R', 'Q']
-        enemy_diagonal = ['B', 'Q']
+        enemy_orthogonal = WHITE_ORTHOGONAL_SLIDERS
+        enemy_diagonal = WHITE_DIAGONAL_SLIDERS
         enemy_pawn = 'P'
         enemy_knight = 'N'
         pawn_deltas = BLACK_PAWN_DELTAS['attacks']
@@ -519,15 +582,15 @@ def get_checks_and_pins(position, source_index):
 def is_en_passant_pinned(position, source, ep_square):
     board = position.board
     color_to_play = position.color_to_play
-    king_index = position.piece_lists['K' if color_to_play == 'white' else 'k'][0]
+    king_index = position.piece_lists['K' if color_to_play == WHITE else 'k'][0]
 
     # check if the king is on the same rank as the capturing pawn
     if king_index // 10 != source // 10:
         return False
 
-    enemy_rook = 'r' if color_to_play == 'white' else 'R'
-    enemy_queen = 'q' if color_to_play == 'white' else 'Q'
-    captured_pawn_source = ep_square + (10 if color_to_play == 'white' else -10) # the pawn that would get taken en passant
+    enemy_rook = 'r' if color_to_play == WHITE else 'R'
+    enemy_queen = 'q' if color_to_play == WHITE else 'Q'
+    captured_pawn_source = ep_square + (10 if color_to_play == WHITE else -10) # the pawn that would get taken en passant
 
     # cast rays horizontally from the king
     for direction in [-1, 1]:
@@ -548,19 +611,6 @@ def is_en_passant_pinned(position, source, ep_square):
     
     return False    # if we never returned True inside the loop, there is no en passant pin
 
-# generate pseudo-legal target squares for non-sliding pieces, returns an array of all non-out-of-bounds squares
-def non_sliding_moves(position, source_index, deltas):   # used by kings and knights
-    destinations = []
-
-    for delta in deltas:
-        target_index = source_index + delta
-        target_square = position.board[target_index]
-
-        if target_square != OUT_OF_BOUNDS:
-            destinations.append(target_index)
-
-    return destinations
-
 # generate pseudo-legal target squares for sliding pieces, returns an array of all non-out-of-bounds squares
 def sliding_moves(position, source_index, deltas):      # used by bishops, rooks, and queens
     destinations = []
@@ -580,11 +630,31 @@ def sliding_moves(position, source_index, deltas):      # used by bishops, rooks
     
     return destinations
 
-def king_moves(position, source_index):     # wrapper function for non_sliding_moves(), castling handled in generate_moves()
-    return non_sliding_moves(position, source_index, KING_DELTAS)
+# captures-only counterpart of king_moves() / knight_moves(), returns only the occupied squares among the given targets
+# (friendly pieces are filtered later)
+def non_sliding_captures(board, targets):
+    return [target_index for target_index in targets if board[target_index] != EMPTY]
+
+# captures-only counterpart of sliding_moves(), walks each ray to its first piece and skips the empty squares before it
+def sliding_captures(board, source_index, steps):
+    destinations = []
+
+    for step in steps:
+        target_index = source_index + step
+        while board[target_index] == EMPTY:
+            target_index += step
+
+        if board[target_index] != OUT_OF_BOUNDS:
+            destinations.append(target_index)
+
+    return destinations
+
+# pseudo-legal target squares for non-sliding pieces, the shared precomputed tuple is returned and must not be modified
+def king_moves(position, source_index):     # castling handled in generate_moves()
+    return KING_TARGETS[source_index]
 
-def knight_moves(position, source_index):   # wrapper function for non_sliding_moves()
-    return non_sliding_moves(position, source_index, KNIGHT_DELTAS)
+def knight_moves(position, source_index):
+    return KNIGHT_TARGETS[source_index]
 
 def rook_moves(position, source_index):     # wrapper function for sliding_moves()
     return sliding_moves(position, source_index, ROOK_DELTAS)
@@ -649,4 +719,115 @@ def black_pawn_moves(position, source_index):   # en passant and promotion will
         if target_square in WHITE_PIECES: # if square is an enemy piece
             destinations['attacks'].append(target_index)
 
-    return destinations
\ No newline at end of file
+    return destinations
+
+# --- STATIC EXCHANGE EVALUATION ---
+
+# helper function for static_exchange_eval()
+# finds the least valuable piece of the given color attacking the target square, pieces in "removed" are treated as
+# already traded off, so sliders behind them (x-rays) are picked up
+# returns (index, piece) of the attacker, or None if the square is not attacked
+NO_SQUARES = frozenset()    # empty removed set for least_valuable_attacker, used for plain attack tests
+
+def least_valuable_attacker(board, target_index, color, removed):
+    if color == WHITE:
+        pawn, knight, bishop, rook, queen, king = 'P', 'N', 'B', 'R', 'Q', 'K'
+        pawn_sources = (target_index + 9, target_index + 11)    # white pawns attack upwards (-9 / -11)
+    else:
+        pawn, knight, bishop, rook, queen, king = 'p', 'n', 'b', 'r', 'q', 'k'
+        pawn_sources = (target_index - 9, target_index - 11)    # black pawns attack downwards (+9 / +11)
+
+    for index in pawn_sources:
+        if board[index] == pawn and index not in removed:
+            return index, pawn
+
+    for delta in KNIGHT_DELTAS:
+        index = target_index + delta
+        if board[index] == knight and index not in removed:
+            return index, knight
+
+    # walk each ray to its first remaining piece, remember the first bishop / rook / queen found
+    bishop_index = rook_index = queen_index = None
+    for step in DIAGONAL_STEPS:
+        index = target_index + step
+        while board[index] == EMPTY or index in removed:
+            index += step
+        square = board[index]
+        if square == bishop and bishop_index is None:
+            bishop_index = index
+        elif square == queen and queen_index is None:
+            queen_index = index
+
+    if bishop_index is not None:
+        return bishop_index, bishop
+
+    for step in ORTHOGONAL_STEPS:
+        index = target_index + step
+        while board[index] == EMPTY or index in removed:
+            index += step
+        square = board[index]
+        if square == rook and rook_index is None:
+            rook_index = index
+        elif square == queen and queen_index is None:
+            queen_index = index
+
+    if rook_index is not None:
+        return rook_index, rook
+    if queen_index is not None:
+        return queen_index, queen
+
+    for delta in KING_DELTAS:
+        index = target_index + delta
+        if board[index] == king and index not in removed:
+            return index, king
+
+    return None
+
+# returns True if the side to move's king is attacked, walks the king's rays once instead of generating moves
+def in_check(position):
+    if position.color_to_play == WHITE:
+        king_index = position.piece_lists['K'][0]
+    else:
+        king_index = position.piece_lists['k'][0]
+    return least_valuable_attacker(position.board, king_index, position.color_to_play ^ 1, NO_SQUARES) is not None
+
+# estimates the material outcome of a capture, assuming both sides keep recapturing on the destination square with
+# their least valuable attacker and may stop whenever continuing would lose material (pins are ignored)
+# returns the net gain in centipawns for the side making the capture, negative values are losing captures
+def static_exchange_eval(position, move):
+    board = position.board
+    target_index = move.destination_index
+
+    gains = [SEE_PIECE_VALUES[move.piece_captured]]
+    piece_on_target = move.moving_piece
+    if move.promotion_piece:
+        gains[0] += SEE_PIECE_VALUES[move.promotion_piece] - SEE_PIECE_VALUES[move.moving_piece]
+        piece_on_target = move.promotion_piece
+
+    removed = {move.source_index}
+    color = position.color_to_play ^ 1      # the opponent makes the first recapture
+    depth = 0
+
+    # build the swap list, gains[depth] is the score for the side that just captured, if play stopped there
+    while True:
+        attacker = least_valuable_attacker(board, target_index, color, removed)
+        if attacker is None:
+            break
+
+        depth += 1
+        gains.append(SEE_PIECE_VALUES[piece_on_target] - gains[depth - 1])
+
+        # neither side can improve on standing pat from here, stop early
+        if max(-gains[depth - 1], gains[depth]) < 0:
+            break
+
+        attacker_index, piece_on_target = attacker
+        removed.add(attacker_index)
+        color ^= 1
+
+    # negamax the swap list back to the first capture, each side may decline to recapture
+    while depth > 0:
+        gains[depth - 1] = -max(-gains[depth - 1], gains[depth])
+        depth -= 1
+
+    return gains[0]
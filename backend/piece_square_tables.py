@@ -0,0 +1,236 @@
+# static piece-square scoring shared by board.py and evaluation.py
+# board.py keeps running totals of these scores in make_move / unmake_move (incremental evaluation),
+# so evaluate_position only has to compute the terms that depend on the rest of the board (mobility, king safety)
+from utils import TO_64  # used to convert the 120-length position.board index to a 64-square index for PSTs
+
+# DATA STRUCTURES
+# a lookup table to find the vertically mirrored square index-based
+# used to correctly apply white-oriented PSTs to black piece_lists
+FLIP = [
+      0,   1,   2,   3,   4,   5,   6,   7,   8,   9,
+     10,  11,  12,  13,  14,  15,  16,  17,  18,  19,
+     20,  91,  92,  93,  94,  95,  96,  97,  98,  29,
+     30,  81,  82,  83,  84,  85,  86,  87,  88,  39,
+     40,  71,  72,  73,  74,  75,  76,  77,  78,  49,
+     50,  61,  62,  63,  64,  65,  66,  67,  68,  59,
+     60,  51,  52,  53,  54,  55,  56,  57,  58,  69,
+     70,  41,  42,  43,  44,  45,  46,  47,  48,  79,
+     80,  31,  32,  33,  34,  35,  36,  37,  38,  89,
+     90,  21,  22,  23,  24,  25,  26,  27,  28,  99,
+    100, 101, 102, 103, 104, 105, 106, 107, 108, 109,
+    110, 111, 112, 113, 114, 115, 116, 117, 118, 119
+]
+
+# PIECE SQUARE TABLES (PST), index-based scores used to modify material evaluation
+# all tables are from white's perspectve
+# values from PeSTO's evaluation function
+# mg = mid-game and eg = end-game, use interpolated game_phase value for weights
+MG_PAWN_PST = [
+     0,    0,   0,   0,   0,   0,  0,   0,
+     98, 134,  61,  95,  68, 126, 34, -11,
+     -6,   7,  26,  31,  65,  56, 25, -20,
+    -14,  13,   6,  21,  23,  12, 17, -23,
+    -27,  -2,  -5,  12,  17,   6, 10, -25,
+    -26,  -4,  -4, -10,   3,   3, 33, -12,
+    -35,  -1, -20, -23, -15,  24, 38, -22,
+      0,   0,   0,   0,   0,   0,  0,   0,  
+]
+
+EG_PAWN_PST = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+    178, 173, 158, 134, 147, 132, 165, 187,
+     94, 100,  85,  67,  56,  53,  82,  84,
+     32,  24,  13,   5,  -2,   4,  17,  17,
+     13,   9,  -3,  -7,  -7,  -8,   3,  -1,
+      4,   7,  -6,   1,   0,  -5,  -1,  -8,
+     13,   8,   8,  10,  13,   0,   2,  -7,
+      0,   0,   0,   0,   0,   0,   0,   0,
+]
+
+MG_KNIGHT_PST = [
+    -167, -89, -34, -49,  61, -97, -15, -107,
+     -73, -41,  72,  36,  23,  62,   7,  -17,
+     -47,  60,  37,  65,  84, 129,  73,   44,
+      -9,  17,  19,  53,  37,  69,  18,   22,
+     -13,   4,  16,  13,  28,  19,  21,   -8,
+     -23,  -9,  12,  10,  19,  17,  25,  -16,
+     -29, -53, -12,  -3,  -1,  18, -14,  -19,
+    -105, -21, -58, -33, -17, -28, -19,  -23,
+]
+
+EG_KNIGHT_PST = [
+    -58, -38, -13, -28, -31, -27, -63, -99,
+    -25,  -8, -25,  -2,  -9, -25, -24, -52,
+    -24, -20,  10,   9,  -1,  -9, -19, -41,
+    -17,   3,  22,  22,  22,  11,   8, -18,
+    -18,  -6,  16,  25,  16,  17,   4, -18,
+    -23,  -3,  -1,  15,  10,  -3, -20, -22,
+    -42, -20, -10,  -5,  -2, -20, -23, -44,
+    -29, -51, -23, -15, -22, -18, -50, -64,
+]
+
+MG_BISHOP_PST = [
+    -29,   4, -82, -37, -25, -42,   7,  -8,
+    -26,  16, -18, -13,  30,  59,  18, -47,
+    -16,  37,  43,  40,  35,  50,  37,  -2,
+     -4,   5,  19,  50,  37,  37,   7,  -2,
+     -6,  13,  13,  26,  34,  12,  10,   4,
+      0,  15,  15,  15,  14,  27,  18,  10,
+      4,  15,  16,   0,   7,  21,  33,   1,
+    -33,  -3, -14, -21, -13, -12, -39, -21,
+]
+
+EG_BISHOP_PST = [
+    -14, -21, -11,  -8, -7,  -9, -17, -24,
+     -8,  -4,   7, -12, -3, -13,  -4, -14,
+      2,  -8,   0,  -1, -2,   6,   0,   4,
+     -3,   9,  12,   9, 14,  10,   3,   2,
+     -6,   3,  13,  19,  7,  10,  -3,  -9,
+    -12,  -3,   8,  10, 13,   3,  -7, -15,
+    -14, -18,  -7,  -1,  4,  -9, -15, -27,
+    -23,  -9, -23,  -5, -9, -16,  -5, -17,
+]
+
+MG_ROOK_PST = [
+     32,  42,  32,  51, 63,  9,  31,  43,
+     27,  32,  58,  62, 80, 67,  26,  44,
+     -5,  19,  26,  36, 17, 45,  61,  16,
+    -24, -11,   7,  26, 24, 35,  -8, -20,
+    -36, -26, -12,  -1,  9, -7,   6, -23,
+    -45, -25, -16, -17,  3,  0,  -5, -33,
+    -44, -16, -20,  -9, -1, 11,  -6, -71,
+    -19, -13,   1,  17, 16,  7, -37, -26,
+]
+
+EG_ROOK_PST = [
+    13, 10, 18, 15, 12,  12,   8,   5,
+    11, 13, 13, 11, -3,   3,   8,   3,
+     7,  7,  7,  5,  4,  -3,  -5,  -3,
+     4,  3, 13,  1,  2,   1,  -1,   2,
+     3,  5,  8,  4, -5,  -6,  -8, -11,
+    -4,  0, -5, -1, -7, -12,  -8, -16,
+    -6, -6,  0,  2, -9,  -9, -11,  -3,
+    -9,  2,  3, -1, -5, -13,   4, -20,
+]
+
+MG_QUEEN_PST = [
+    -28,   0,  29,  12,  59,  44,  43,  45,
+    -24, -39,  -5,   1, -16,  57,  28,  54,
+    -13, -17,   7,   8,  29,  56,  47,  57,
+    -27, -27, -16, -16,  -1,  17,  -2,   1,
+     -9, -26,  -9, -10,  -2,  -4,   3,  -3,
+    -14,   2, -11,  -2,  -5,   2,  14,   5,
+    -35,  -8,  11,   2,   8,  15,  -3,   1,
+     -1, -18,  -9,  10, -15, -25, -31, -50,
+]
+
+EG_QUEEN_PST = [
+     -9,  22,  22,  27,  27,  19,  10,  20,
+    -17,  20,  32,  41,  58,  25,  30,   0,
+    -20,   6,   9,  49,  47,  35,  19,   9,
+      3,  22,  24,  45,  57,  40,  57,  36,
+    -18,  28,  19,  47,  31,  34,  39,  23,
+    -16, -27,  15,   6,   9,  17,  10,   5,
+    -22, -23, -30, -16, -16, -23, -36, -32,
+    -33, -28, -22, -43,  -5, -32, -20, -41,
+]
+
+MG_KING_PST = [
+    -65,  23,  16, -15, -56, -34,   2,  13,
+     29,  -1, -20,  -7,  -8,  -4, -38, -29,
+     -9,  24,   2, -16, -20,   6,  22, -22,
+    -17, -20, -12, -27, -30, -25, -14, -36,
+    -49,  -1, -27, -39, -46, -44, -33, -51,
+    -14, -14, -22, -46, -44, -30, -15, -27,
+      1,   7,  -8, -64, -43, -16,   9,   8,
+    -15,  36,  12, -54,   8, -28,  24,  14,
+]
+
+EG_KING_PST = [
+    -74, -35, -18, -18, -11,  15,   4, -17,
+    -12,  17,  14,  17,  17,  38,  23,  11,
+     10,  17,  23,  15,  20,  45,  44,  13,
+     -8,  22,  24,  27,  26,  33,  26,   3,
+    -18,  -4,  21,  24,  27,  23,   9, -11,
+    -19,  -3,  11,  21,  23,  16,   7,  -9,
+    -27, -11,   4,  13,  14,   4,  -5, -17,
+    -53, -34, -21, -11, -28, -14, -24, -43
+]
+
+# define central squares to give boosts for pieces that control the center
+INNER_CENTER = {54, 55, 64, 65} # d4, e4, d5, e5
+OUTER_CENTER = {
+    43, 44, 45, 46, 
+    53, 56, 63, 66, 
+    73, 74, 75, 76 
+}
+
+# define home squares to give penalties to undeveloped minor pieces
+KNIGHT_HOME_SQUARES = {22, 27, 92, 97}
+BISHOP_HOME_SQUARES = {23, 26, 93, 96}
+
+# INCREMENTAL EVALUATION TABLES
+# every evaluation term that depends only on a piece and its square is summed into one score per (piece, square):
+# material + PST + central control bonus + undeveloped minor piece penalty + castled king bonus
+# scores are signed from white's perspective (black pieces score negative), indexed as MG_SQUARE_SCORES[piece][index]
+# King = 20000, Q = 900, R = 500, B = 330, N = 320, P = 100
+PIECE_MATERIAL = {'K': 20000, 'Q': 900, 'R': 500, 'B': 330, 'N': 320, 'P': 100}
+PIECE_PSTS = {
+    'K': (MG_KING_PST, EG_KING_PST),
+    'Q': (MG_QUEEN_PST, EG_QUEEN_PST),
+    'R': (MG_ROOK_PST, EG_ROOK_PST),
+    'B': (MG_BISHOP_PST, EG_BISHOP_PST),
+    'N': (MG_KNIGHT_PST, EG_KNIGHT_PST),
+    'P': (MG_PAWN_PST, EG_PAWN_PST),
+}
+
+# mid-game bonuses for (inner center, outer center) squares, and the penalty for a minor piece on a home square
+CENTER_BONUSES = {'B': (10, 5), 'N': (20, 10), 'P': (25, 15)}
+HOME_SQUARES = {'B': BISHOP_HOME_SQUARES, 'N': KNIGHT_HOME_SQUARES}
+HOME_SQUARE_PENALTY = 10
+
+# mid-game bonus when the king is on a castling square
+CASTLED_KING_SQUARES = {'K': {97, 93}, 'k': {27, 23}}
+CASTLED_KING_BONUS = 40
+
+# game phase contribution of each piece: Queen = 4, Rook = 2, Bishop = 1, Knight = 1, maximum total is 24
+PHASE_SCORES = {
+    'K': 0, 'Q': 4, 'R': 2, 'B': 1, 'N': 1, 'P': 0,
+    'k': 0, 'q': 4, 'r': 2, 'b': 1, 'n': 1, 'p': 0,
+}
+
+MG_SQUARE_SCORES = {}
+EG_SQUARE_SCORES = {}
+for piece in PHASE_SCORES:
+    piece_type = piece.upper()
+    sign = 1 if piece == piece_type else -1     # white pieces add to the score, black pieces subtract
+    mg_pst, eg_pst = PIECE_PSTS[piece_type]
+    mg_scores = [0] * 120
+    eg_scores = [0] * 120
+
+    for index in range(120):
+        if TO_64[index] == -1: continue     # out-of-bounds squares keep a score of 0
+
+        # flip index to adjust PST from white's perspective to black's
+        index_64 = TO_64[index] if sign == 1 else TO_64[FLIP[index]]
+        mg_score = PIECE_MATERIAL[piece_type] + mg_pst[index_64]
+        eg_score = PIECE_MATERIAL[piece_type] + eg_pst[index_64]
+
+        if piece_type in CENTER_BONUSES:
+            inner_bonus, outer_bonus = CENTER_BONUSES[piece_type]
+            if index in INNER_CENTER:
+                mg_score += inner_bonus
+            elif index in OUTER_CENTER:
+                mg_score += outer_bonus
+
+        if piece_type in HOME_SQUARES and index in HOME_SQUARES[piece_type]:
+            mg_score -= HOME_SQUARE_PENALTY
+
+        if piece in CASTLED_KING_SQUARES and index in CASTLED_KING_SQUARES[piece]:
+            mg_score += CASTLED_KING_BONUS
+
+        mg_scores[index] = sign * mg_score
+        eg_scores[index] = sign * eg_score
+
+    MG_SQUARE_SCORES[piece] = mg_scores
+    EG_SQUARE_SCORES[piece] = eg_scores
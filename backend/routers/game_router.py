@@ -6,86 +6,230 @@ from schemas.game_schemas import (
     StatusResponse,
     PruneRequest,
 )
-import uuid
-import time
+from services.game_service import engine_think_time
 import asyncio
+import itertools
+import heapq
+import time
 
 # --- constants ---
 WORKER_TIMEOUT = 10   # workers must respond in 10 seconds, otherwise timeout
 MAX_SESSIONS = 8      # concurrent session cap
 NUM_WORKERS = 8       # the number of engine instances
+MAX_SPLIT_HELPERS = 3 # idle workers that may join one play-move search, root moves are split between them
 
 router = APIRouter()
 
-def _dispatch_task(task_queues, results_dict, worker_id: int, command: str, kwargs: dict):
+# task ids only need to be unique within this dispatcher process, a counter avoids a uuid4 call per task
+# and an int key pickles smaller and hashes faster than a 32-character hex string
+_task_ids = itertools.count(1)
+
+def new_task_id() -> int:
+    return next(_task_ids)
+
+async def _dispatch_task(task_queues, pending_results, worker_id: int, command: str, kwargs: dict):
     """
-    Blocking helper function. 
     Sends a task to a specific worker and waits for the result.
+    Runs on the event loop, no executor thread is held while the worker searches.
     """
 
-    task_id = uuid.uuid4().hex
-    task_queues[worker_id].put((task_id, command, kwargs))
+    task = _send_task(task_queues, pending_results, worker_id, command, kwargs)
+    return await _await_task(pending_results, task)
 
-    # wait for result to appear in results_dict
-    start_time = time.time()
-    while task_id not in results_dict:
-        if time.time() - start_time > WORKER_TIMEOUT:
-            raise TimeoutError('Request timed out waiting for chess engine worker')
-        
-        time.sleep(0.01)
+def _send_task(task_queues, pending_results, worker_id: int, command: str, kwargs: dict):
+    """Sends a task to a specific worker without waiting, returns the (task_id, future) to pass to _await_task."""
+
+    # register the task before sending it, so the result listener always finds its callback
+    # the listener runs on its own thread, so the (status, result) tuple is handed to the event loop thread-safely
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    task_id = new_task_id()
+    pending_results[task_id] = lambda result: loop.call_soon_threadsafe(_set_task_result, future, result)
+    # the worker drops the task if it is still queued once this request has stopped waiting
+    task_queues[worker_id].put((task_id, command, kwargs, time.time() + WORKER_TIMEOUT))
+    return task_id, future
 
-    # retrieve and remove result from shared dict
-    status, result_data = results_dict.pop(task_id)
+def _set_task_result(future, result):
+    # the waiting request may already have timed out and cancelled the future
+    if not future.done():
+        future.set_result(result)
+
+async def _await_task(pending_results, task):
+    """Waits for a task sent with _send_task and returns its result."""
+
+    task_id, future = task
+
+    # suspend until the result listener delivers the result, then remove the callback
+    try:
+        status, result_data = await asyncio.wait_for(future, WORKER_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise TimeoutError('Request timed out waiting for chess engine worker')
+    finally:
+        pending_results.pop(task_id, None)
 
     if status == 'error':
         raise RuntimeError(result_data)
     
     return result_data
 
+def acquire_least_loaded_worker(worker_load, load_heap) -> int:
+    """
+    Picks the worker with the fewest active games and adds one game to its load.
+    Must be called while holding session_count_lock.
+
+    load_heap holds (load, worker_id) entries, an entry whose load no longer matches worker_load is stale 
+    (the worker was released after it was pushed) and is discarded when it reaches the top.
+    """
+
+    while True:
+        load, worker_id = heapq.heappop(load_heap)
+        if load == worker_load[worker_id]:
+            break
+
+    worker_load[worker_id] = load + 1
+    heapq.heappush(load_heap, (load + 1, worker_id))
+    return worker_id
+
+def release_worker_load(worker_load, load_heap, worker_id: int, count: int = 1):
+    """
+    Removes count games from a worker's load, never going below 0, and pushes its new heap entry.
+    Must be called while holding session_count_lock.
+    """
+
+    new_load = max(0, worker_load[worker_id] - count)
+    worker_load[worker_id] = new_load
+
+    # stale entries with high loads can sit below the top indefinitely, rebuild once they outnumber the workers
+    if len(load_heap) >= 2 * len(worker_load):
+        load_heap[:] = [(load, i) for i, load in enumerate(worker_load)]
+        heapq.heapify(load_heap)
+    else:
+        heapq.heappush(load_heap, (new_load, worker_id))
+
+def reserve_idle_workers(worker_load, load_heap, limit: int) -> list:
+    """
+    Reserves up to limit workers with no active games as split search helpers, counting each as one game so new
+    sessions are routed elsewhere while it searches. Must be called while holding session_count_lock.
+    """
+
+    helper_ids = []
+    for worker_id, load in enumerate(worker_load):
+        if len(helper_ids) == limit:
+            break
+        if load == 0:
+            worker_load[worker_id] = 1
+            heapq.heappush(load_heap, (1, worker_id))
+            helper_ids.append(worker_id)
+
+    return helper_ids
+
+async def _play_move_split(task_queues, pending_results, target_worker_id: int, helper_ids: list, play_move_req):
+    """
+    Plays a move with the engine's reply searched by the session's worker and helper workers together.
+
+    The root moves are dealt round-robin between the workers, each runs its own iterative deepening on its share, 
+    and the best move is taken at the deepest depth every worker completed, so all compared evals share a depth.
+    """
+
+    session_id = play_move_req.session_id
+    status, result_data = await _dispatch_task(
+        task_queues, pending_results,
+        worker_id=target_worker_id,
+        command='prepare_split_turn',
+        kwargs={
+            'player_move': play_move_req.player_move,
+            'session_id': session_id,
+            'client_fen': play_move_req.client_fen,
+        }
+    )
+    if status == 'done':    # book move or forced reply, played by the session's worker
+        return result_data
+    
+    move_history, root_moves = result_data
+    participants = [target_worker_id] + helper_ids[:len(root_moves) - 1]
+    
+    # the session's worker searches its own board, helpers rebuild the game from its move history
+    tasks = []
+    for i, worker_id in enumerate(participants):
+        kwargs = {'root_moves': root_moves[i::len(participants)]}
+        if worker_id == target_worker_id:
+            kwargs['session_id'] = session_id
+        else:
+            kwargs['move_history'] = move_history
+        tasks.append(_send_task(task_queues, pending_results, worker_id, 'search_root_moves', kwargs))
+
+    # wait for every share, a worker that failed or completed no depth in time is left out of the comparison
+    results = []
+    shares = await asyncio.gather(
+        *(_await_task(pending_results, task) for task in tasks), return_exceptions=True,
+    )
+    for share in shares:
+        if isinstance(share, (RuntimeError, TimeoutError)):
+            print(f'A split search share failed: {share}')
+        elif isinstance(share, BaseException):
+            raise share
+        else:
+            results.append(share)
+
+    completed = [depth_results for depth_results, _ in results if depth_results]
+    if not completed:
+        raise RuntimeError('Engine failed to find a move')
+
+    common_depth = min(len(depth_results) for depth_results in completed)
+    engine_move, _ = max(
+        (depth_results[common_depth - 1] for depth_results in completed), 
+        key=lambda result: result[1],
+    )
+
+    return await _dispatch_task(
+        task_queues, pending_results,
+        worker_id=target_worker_id,
+        command='play_engine_move',
+        kwargs={
+            'session_id': session_id,
+            'engine_move': engine_move,
+            'depth': common_depth,
+            'nodes': sum(nodes for _, nodes in results),
+        }
+    )
+
 @router.post('/new-game', response_model=NewGameResponse)
 async def new_game(request: Request, new_game_req: NewGameRequest):
-    loop = asyncio.get_running_loop()
-
-    session_count = request.app.state.session_count
+    app_state = request.app.state
     worker_load = request.app.state.worker_load
+    load_heap = request.app.state.load_heap
     session_map = request.app.state.session_map
     task_queues = request.app.state.task_queues
-    results_dict = request.app.state.results_dict
+    pending_results = request.app.state.pending_results
     session_count_lock = request.app.state.session_count_lock
 
-    def new_game_task():
-        # reserve a session slot, use lock to prevent race conditions
+    async def new_game_task():
+        # reserve a session slot and pick the worker with the least load in one critical section
         with session_count_lock:
-            if session_count.value >= MAX_SESSIONS:
+            if app_state.session_count >= MAX_SESSIONS:
                 raise ValueError('Server is at maximum capacity, please try again later')
             
-            session_count.value += 1
-
-        with session_count_lock:
-            # find the worker with the least load
-            min_load = float('inf')
-            target_worker_id = 0
-            for i, load in enumerate(worker_load):
-                if load < min_load:
-                    min_load = load
-                    target_worker_id = i
-            worker_load[target_worker_id] += 1
+            app_state.session_count += 1
+            target_worker_id = acquire_least_loaded_worker(worker_load, load_heap)
         
         try:
             # send task to chosen worker and wait for result
-            result = _dispatch_task(
-                task_queues, results_dict,
+            result = await _dispatch_task(
+                task_queues, pending_results,
                 worker_id=target_worker_id,
                 command='new_game',
-                kwargs={'player_move': new_game_req.player_move}
+                kwargs={
+                    'player_move': new_game_req.player_move,
+                    'think_time': engine_think_time(app_state.session_count, MAX_SESSIONS),
+                }
             )
             
             new_fen, move_info, game_id = result
 
         except Exception as e:
             with session_count_lock:
-                session_count.value -= 1
-                worker_load[target_worker_id] -= 1
+                app_state.session_count -= 1
+                release_worker_load(worker_load, load_heap, target_worker_id)
             
             raise e
         
@@ -95,7 +239,7 @@ async def new_game(request: Request, new_game_req: NewGameRequest):
         return new_fen, move_info, game_id
             
     try:
-        new_fen, move_info, game_id = await loop.run_in_executor(None, new_game_task)
+        new_fen, move_info, game_id = await new_game_task()
         return NewGameResponse(
             new_fen = new_fen,
             move_played = move_info['move'],
@@ -116,14 +260,15 @@ async def new_game(request: Request, new_game_req: NewGameRequest):
     
 @router.post('/play-move', response_model=PlayMoveResponse)
 async def play_move(request: Request, play_move_req: PlayMoveRequest):
-    loop = asyncio.get_running_loop()
-
     session_map = request.app.state.session_map
     task_queues = request.app.state.task_queues
-    results_dict = request.app.state.results_dict
-    session_count = request.app.state.session_count
+    pending_results = request.app.state.pending_results
+    app_state = request.app.state
+    worker_load = request.app.state.worker_load
+    load_heap = request.app.state.load_heap
+    session_count_lock = request.app.state.session_count_lock
     
-    def play_move_task():
+    async def play_move_task():
         session_id = play_move_req.session_id
 
         # find which worker is handling this game
@@ -131,23 +276,38 @@ async def play_move(request: Request, play_move_req: PlayMoveRequest):
         if target_worker_id is None:
             raise KeyError('Invalid or expired session ID')
 
+        # under light load, idle workers join the search for the engine's reply
+        helper_ids = []
+        with session_count_lock:
+            if app_state.session_count < len(worker_load) / 2:
+                helper_ids = reserve_idle_workers(worker_load, load_heap, MAX_SPLIT_HELPERS)
+
+        if helper_ids:
+            try:
+                return await _play_move_split(task_queues, pending_results, target_worker_id, helper_ids, play_move_req)
+            finally:
+                with session_count_lock:
+                    for worker_id in helper_ids:
+                        release_worker_load(worker_load, load_heap, worker_id)
+
         # send task to the correct worker and wait
-        return _dispatch_task(
-            task_queues, results_dict,
+        return await _dispatch_task(
+            task_queues, pending_results,
             worker_id=target_worker_id,
             command='play_move',
             kwargs={
                 'player_move': play_move_req.player_move,
                 'session_id': play_move_req.session_id,
                 'client_fen': play_move_req.client_fen,
+                'think_time': engine_think_time(app_state.session_count, MAX_SESSIONS),
             }
         )
     
     try:
-        new_fen, move_info = await loop.run_in_executor(None, play_move_task)
+        new_fen, move_info = await play_move_task()
 
         # after the move is complete, check server capacity and inform frontend
-        current_count = session_count.value
+        current_count = app_state.session_count
         status = 'ok'
         
         if current_count >= MAX_SESSIONS:
@@ -178,7 +338,7 @@ async def play_move(request: Request, play_move_req: PlayMoveRequest):
 async def getStatus(request: Request):
     """Lets frontend know if server is at max concurrency limit, under heavy load, or at normal capacity."""
 
-    current_count = request.app.state.session_count.value
+    current_count = request.app.state.session_count
     if current_count >= MAX_SESSIONS:
         return StatusResponse(status='busy')
     # the point at which SMT will be needed (assuming max. 2 workers per logical core)
@@ -193,12 +353,11 @@ async def prune_session(request: Request, prune_req: PruneRequest):
     Handles a fire-and-forget request form a closing client to prune a session.
     """
 
-    loop = asyncio.get_running_loop()
-
     # gather necessary shared state objects
     session_map = request.app.state.session_map
-    session_count = request.app.state.session_count
+    app_state = request.app.state
     worker_load = request.app.state.worker_load
+    load_heap = request.app.state.load_heap
     session_count_lock = request.app.state.session_count_lock
     task_queues = request.app.state.task_queues
 
@@ -211,8 +370,8 @@ async def prune_session(request: Request, prune_req: PruneRequest):
             with session_count_lock:
                 if session_map.get(session_id) == worker_id:
                     print(f'Pruning session {session_id} from dispatcher state')
-                    session_count.value -= 1
-                    worker_load[worker_id] -= 1
+                    app_state.session_count -= 1
+                    release_worker_load(worker_load, load_heap, worker_id)
 
                     try:
                         del session_map[session_id]
@@ -220,10 +379,10 @@ async def prune_session(request: Request, prune_req: PruneRequest):
                         pass  # it was already removed, which is fine
 
             # send a fire-and-forget command to the worker to clean up its memory
-            task_queues[worker_id].put((None, 'prune_single_session', {'session_id': session_id}))
+            task_queues[worker_id].put((None, 'prune_single_session', {'session_id': session_id}, None))
 
     try:
-        await loop.run_in_executor(None, prune_task)
+        prune_task()
     except Exception as e:
         print(f'An error occurred while pruning a closed session: {e}')
         raise HTTPException(status_code=500, detail='An internal error occurred during session pruning')
@@ -1,53 +1,93 @@
 from board import Board
 from engine import Search
 from move_generator import generate_moves
-from utils import board_to_fen, move_to_algebraic, parse_user_move
-import uuid
+from utils import board_to_fen, move_to_algebraic, parse_user_move, COLOR_NAMES
+import os
 import time
 import traceback
 
 # --- constants ---
 ENGINE_THINK_TIME = 6   # engine think time capped at 6 seconds
+# shorter think times as the server fills up: (minimum fraction of MAX_SESSIONS in use, think time), checked in order
+THINK_TIME_BY_LOAD = ((1.0, 1), (0.75, 1.5), (0.5, 3))
+
+# tasks carry the wall-clock time at which the dispatcher stops waiting for them
+# searches are cut short so their result lands RESULT_MARGIN seconds before that, and skipped below MIN_THINK_TIME
+SEARCH_COMMANDS = ('new_game', 'play_move', 'prepare_split_turn', 'search_root_moves')
+RESULT_MARGIN = 1
+MIN_THINK_TIME = 0.5
 SESSION_TIMEOUT = 900   # 15 minutes
 
-def run_worker(task_queue, result_dict):    
+def run_worker(task_queue, result_queue, cpu=None):    
     """
     The main loop for a worker process.
 
     Args:
         task_queue (multiprocessing.Queue): the queue to receive tasks from
-        results_dict (multiprocessing.Dict): shared dict to put results in
+        result_queue (multiprocessing.SimpleQueue): shared queue to put (task_id, status, result) tuples on
+        cpu (int | None): the CPU to pin this worker to, None leaves it to the OS scheduler
     """
 
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except (AttributeError, OSError) as e:
+            print(f'Could not pin worker to CPU {cpu}: {e}')
+
     # worker's private memory, mapping a Board and Search instance to each assigned session
     active_sessions = {}
+
     print('Chess worker process started')
 
     while True:
         try:
             # blocking call, worker sleeps here until a task arrives
-            task_id, command, kwargs = task_queue.get()
+            task_id, command, kwargs, expires_at = task_queue.get()
+
+            # a task still queued after its dispatcher gave up is dropped instead of run, so a timed-out move is
+            # never applied to a session behind the client's back, and a backed-up worker catches up
+            if expires_at is not None:
+                time_left = expires_at - time.time()
+                if command in SEARCH_COMMANDS:
+                    time_left -= RESULT_MARGIN
+                    if time_left < MIN_THINK_TIME:
+                        print(f'Dropping expired {command} task')
+                        continue
+                    kwargs['think_time'] = min(kwargs.get('think_time', ENGINE_THINK_TIME), time_left)
+                elif time_left <= 0:
+                    print(f'Dropping expired {command} task')
+                    continue
 
             # --- new_game task ---
+            # timed-out sessions are only pruned by the dispatcher's prune_sessions task, which reports the count
+            # back so the dispatcher's session counters stay in step
             if command == 'new_game':
-                _prune_inactive_sessions(active_sessions)
-
                 result = _new_game(active_sessions, **kwargs)
-                result_dict[task_id] = ('ok', result)
+                result_queue.put((task_id, 'ok', result))
 
             # --- play_move task ---
             elif command == 'play_move':
                 result = _play_move(active_sessions, **kwargs)
-                result_dict[task_id] = ('ok', result)
+                result_queue.put((task_id, 'ok', result))
+
+            # --- split root search tasks, see routers/game_router.py ---
+            elif command == 'prepare_split_turn':
+                result = _prepare_split_turn(active_sessions, **kwargs)
+                result_queue.put((task_id, 'ok', result))
+
+            elif command == 'search_root_moves':
+                result = _search_root_moves(active_sessions, **kwargs)
+                result_queue.put((task_id, 'ok', result))
+
+            elif command == 'play_engine_move':
+                result = _play_engine_move(active_sessions, **kwargs)
+                result_queue.put((task_id, 'ok', result))
 
             # --- prune_sessions task
             elif command == 'prune_sessions':
-                sessions_before = len(active_sessions)
-                _prune_inactive_sessions(active_sessions)
-                sessions_after = len(active_sessions)
-
-                pruned_count = sessions_before - sessions_after
-                result_dict[task_id] = ('ok', pruned_count)
+                # the dispatcher needs the ids, not just a count, to drop them from its session_map
+                pruned_ids = _prune_inactive_sessions(active_sessions)
+                result_queue.put((task_id, 'ok', pruned_ids))
 
             # --- prune_single_session task ---
             elif command == 'prune_single_session':
@@ -57,90 +97,94 @@ def run_worker(task_queue, result_dict):
                     del active_sessions[target_id]
 
             else:
-                result_dict[task_id] = ('error', 'Unknown command')
+                result_queue.put((task_id, 'error', 'Unknown command'))
         
         except Exception as e:
             # safety net, prevents dispatcher from waiting forever for a response
             print(f'An error occurred in a worker process: {e}')
             traceback.print_exc()
 
-            # check if task_id was defined before writing to result_dict
+            # check if task_id was defined before writing to result_queue
             if 'task_id' in locals():
-                result_dict[task_id] = ('error', str(e))
+                result_queue.put((task_id, 'error', str(e)))
+
+def engine_think_time(session_count, max_sessions):
+    """Returns the engine's think time for the current server load, so queued moves drain faster when busy."""
+
+    for load_fraction, think_time in THINK_TIME_BY_LOAD:
+        if session_count >= load_fraction * max_sessions:
+            return think_time
+    
+    return ENGINE_THINK_TIME
 
 def _prune_inactive_sessions(active_sessions):
-    """Iterates through active_sessions and prunes any sessions that have timed out."""
+    """Iterates through active_sessions and prunes any sessions that have timed out, returns the pruned game ids."""
 
     current_time = time.time()
 
-    # get all uuids corresponding to timed-out sessions
+    # get all game ids corresponding to timed-out sessions
     timed_out_sessions = [
         game_id for game_id, session in active_sessions.items()
         if (current_time - session['last_activity']) > SESSION_TIMEOUT
     ]
 
-    # prune all timed-out uuids
+    # prune all timed-out game ids
     for game_id in timed_out_sessions:
         print(f'Pruning inactive session: {game_id}')
         del active_sessions[game_id]
 
-def _new_game(active_sessions, player_move: str | None):
+    return timed_out_sessions
+
+def _new_game(active_sessions, player_move: str | None, think_time: float = ENGINE_THINK_TIME):
     """Creates a new active session and initializes the Board and Search instances."""
 
     board = Board()
     search = Search(depth=64)
-    game_id = str(uuid.uuid4())
+    game_id = os.urandom(16).hex()  # same 128 random bits as a uuid4, without building a UUID object
     
     # create a new game in sessions dict
     active_sessions[game_id] = {
         'search': search,
         'board': board,
+        'moves': [],    # uci moves played from the start position, lets helper workers rebuild the game
+        'last_fen': None,   # FEN sent to the client after the last completed turn, None while a turn is in progress
         'last_activity': time.time(),
     }
+    moves_played = active_sessions[game_id]['moves']
 
     # if applicable, make the player's move first
     if player_move:
-        _make_player_move(board, player_move)
+        moves_played.append(_make_player_move(board, player_move))
 
     # computer's turn
-    move_info = _play_engine_turn(board, search, ENGINE_THINK_TIME)
-
-    active_sessions[game_id]['last_activity'] = time.time()
+    move_info = _play_engine_turn(board, search, think_time)
+    moves_played.append(move_info['move'])
+    new_fen = _finish_turn(active_sessions[game_id])
     
     # return the session id, along with the computer's move information and new FEN
     return (
-        board_to_fen(board),
+        new_fen,
         move_info,
         game_id,
     )
 
-def _play_move(active_sessions, player_move: str, session_id: str, client_fen: str):
+def _play_move(
+    active_sessions, player_move: str, session_id: str, client_fen: str, think_time: float = ENGINE_THINK_TIME,
+):
     """Receives player's move from frontend, plays it, and returns FEN with response."""
 
-    board = None
-    search = None
-
-    # get this session's board and search instances
-    session_data = active_sessions.get(session_id)
-    if not session_data:
-        raise KeyError('Invalid or expired session ID')
-    
+    session_data = _get_synced_session(active_sessions, session_id, client_fen)
     board = session_data['board']
     search = session_data['search']
-
-    # ensure the client's FEN is the same as the server's
-    server_fen = board_to_fen(board)
-    if (server_fen != client_fen):
-        raise ValueError('Client board is out of sync')
     
     # make the player's move
-    _make_player_move(board, player_move)
+    session_data['moves'].append(_make_player_move(board, player_move))
+    session_data['last_fen'] = None
 
     # play the engine's response
-    move_info = _play_engine_turn(board, search, ENGINE_THINK_TIME)
-    new_fen = board_to_fen(board)
-
-    session_data['last_activity'] = time.time()
+    move_info = _play_engine_turn(board, search, think_time)
+    session_data['moves'].append(move_info['move'])
+    new_fen = _finish_turn(session_data)
 
     # return the updated FEN and move information
     return (
@@ -148,22 +192,141 @@ def _play_move(active_sessions, player_move: str, session_id: str, client_fen: s
         move_info,
     )
 
+def _prepare_split_turn(
+    active_sessions, player_move: str, session_id: str, client_fen: str, think_time: float = ENGINE_THINK_TIME,
+):
+    """
+    First step of a split root search: plays the player's move, then either plays a book move (the turn is done)
+    or returns what helper workers need to search the engine's reply: the game's move history and the root moves.
+    """
+
+    session_data = _get_synced_session(active_sessions, session_id, client_fen)
+    board = session_data['board']
+    search = session_data['search']
+
+    session_data['moves'].append(_make_player_move(board, player_move))
+    session_data['last_fen'] = None
+    session_data['last_activity'] = time.time()
+
+    # book moves and positions with at most one reply need no search, finish the turn on this worker
+    root_moves, _ = generate_moves(board)
+    if len(root_moves) <= 1:
+        move_info = _play_engine_turn(board, search, think_time)
+    else:
+        # the book is probed once here and its move played as is, a second probe could draw a different move
+        book_move = search.find_book_move(board)
+        if book_move is None:
+            return ('split', (list(session_data['moves']), [move_to_algebraic(move) for move in root_moves]))
+        move_info = _play_book_move(board, book_move)
+
+    session_data['moves'].append(move_info['move'])
+    return ('done', (_finish_turn(session_data), move_info))
+
+def _search_root_moves(
+    active_sessions, root_moves: list, 
+    session_id: str | None = None, move_history: list | None = None, think_time: float = ENGINE_THINK_TIME,
+):
+    """
+    Searches the engine's reply restricted to root_moves, either on this worker's own session or on a board rebuilt
+    from move_history. Returns the (uci move, eval) of each completed depth and the node count.
+    """
+
+    if session_id is not None:
+        session_data = active_sessions.get(session_id)
+        if not session_data:
+            raise KeyError('Invalid or expired session ID')
+        board = session_data['board']
+        search = session_data['search']
+    else:
+        # replay the game from the start position so repetition history matches the session's board
+        board = Board()
+        for uci_move in move_history:
+            _make_player_move(board, uci_move)
+
+        # a fresh Search for every share, TT entries and move-ordering tables from another game (with its own
+        # repetition history) must not carry over, and allocating one costs milliseconds against seconds of search
+        search = Search(depth=64)
+
+    engine_response = search.find_best_move(
+        board, board.color_to_play, think_time, root_move_filter=set(root_moves),
+    )
+    depth_results = [(move_to_algebraic(move), score) for move, score in engine_response['depth_results']]
+    return depth_results, engine_response['nodes']
+
+def _play_engine_move(active_sessions, session_id: str, engine_move: str, depth: int, nodes: int):
+    """Last step of a split root search: plays the move chosen across workers on the session's board."""
+
+    session_data = active_sessions.get(session_id)
+    if not session_data:
+        raise KeyError('Invalid or expired session ID')
+    
+    board = session_data['board']
+    session_data['moves'].append(_make_player_move(board, engine_move))
+    print(f'Engine move (split search): {engine_move}')
+
+    move_info = {
+        'move': engine_move, 
+        'depth': depth, 
+        'nodes': nodes, 
+        'is_book': False,
+    }
+    return _finish_turn(session_data), move_info
+
+def _get_synced_session(active_sessions, session_id, client_fen):
+    """Returns the session's data, checking that the client's FEN matches the server's board."""
+
+    # get this session's board and search instances
+    session_data = active_sessions.get(session_id)
+    if not session_data:
+        raise KeyError('Invalid or expired session ID')
+
+    # ensure the client's FEN is the same as the server's, compared against the FEN sent after the last turn
+    # rather than re-serializing the board, a turn that failed part-way leaves last_fen as None and never matches
+    if (session_data['last_fen'] != client_fen):
+        raise ValueError('Client board is out of sync')
+    
+    return session_data
+
+def _finish_turn(session_data):
+    """Records the FEN sent to the client at the end of a turn and returns it."""
+
+    new_fen = board_to_fen(session_data['board'])
+    session_data['last_fen'] = new_fen
+    session_data['last_activity'] = time.time()
+    return new_fen
+
 def _make_player_move(board, player_move):
+    """Plays a uci move on the board and returns it in normalized uci form."""
+
     legal_moves, _ = generate_moves(board)
     move_to_make = parse_user_move(player_move, legal_moves)
 
     if move_to_make:
         board.make_move(move_to_make)
+        return move_to_algebraic(move_to_make)
     else:
         raise ValueError('User-provided move is invalid')
     
+def _play_book_move(board, book_move):
+    """Plays an opening book move already drawn for the engine, returns the same move info as _play_engine_turn."""
+
+    print(f'Engine move (book): {move_to_algebraic(book_move)}')
+    board.make_move(book_move)
+
+    return {
+        'move': move_to_algebraic(book_move), 
+        'depth': None, 
+        'nodes': None, 
+        'is_book': True,
+    }
+
 def _play_engine_turn(board, search, max_think_time):
     engine_color = board.color_to_play
-    print(f'Engine ({engine_color}) is thinking...')
+    print(f'Engine ({COLOR_NAMES[engine_color]}) is thinking...')
 
-    start_time = time.time()  # log time for performance testing
+    start_time = time.perf_counter()  # log time for performance testing, monotonic and high resolution
     engine_response = search.find_best_move(board, engine_color, max_think_time)
-    end_time = time.time()    # log end time
+    end_time = time.perf_counter()    # log end time
 
     engine_move = engine_response['move']
     depth_reached = engine_response['depth']
@@ -0,0 +1,68 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('dotenv')
+
+import main
+
+
+class AnsweringQueue:
+    """Task queue stand-in that answers a prune_sessions task at once with a fixed list of pruned ids."""
+
+    def __init__(self, pending_results, pruned_ids):
+        self.pending_results = pending_results
+        self.pruned_ids = pruned_ids
+
+    def put(self, task):
+        task_id = task[0]
+        self.pending_results[task_id](('ok', self.pruned_ids))
+
+
+class SilentQueue:
+    """Task queue stand-in for a worker that never answers."""
+
+    def put(self, task):
+        pass
+
+
+def make_app_state(session_map, worker_load):
+    num_workers = len(worker_load)
+    app_state = SimpleNamespace(
+        session_map=session_map,
+        session_count=len(session_map),
+        worker_load=list(worker_load),
+        load_heap=[(load, worker_id) for worker_id, load in enumerate(worker_load)],
+        pending_results={},
+        session_count_lock=threading.Lock(),
+    )
+    return app_state, num_workers
+
+
+def test_answered_workers_are_released_when_an_earlier_worker_times_out(monkeypatch):
+    app_state, num_workers = make_app_state({'a': 0, 'b': 1, 'c': 1}, [1, 2])
+    app_state.task_queues = [SilentQueue(), AnsweringQueue(app_state.pending_results, ['b', 'c'])]
+    monkeypatch.setattr(main, 'NUM_WORKERS', num_workers)
+    monkeypatch.setattr(main, 'WORKER_TIMEOUT', 0.1)
+
+    main.trigger_prune(app_state)
+
+    # worker 0 never answered, so its session is kept, worker 1's pruned sessions are released
+    assert app_state.session_map == {'a': 0}
+    assert app_state.session_count == 1
+    assert app_state.worker_load == [1, 0]
+    assert app_state.pending_results == {}
+
+
+def test_sessions_already_closed_by_their_client_are_not_released_twice(monkeypatch):
+    app_state, num_workers = make_app_state({'a': 0}, [1])
+    app_state.task_queues = [AnsweringQueue(app_state.pending_results, ['a', 'closed'])]
+    monkeypatch.setattr(main, 'NUM_WORKERS', num_workers)
+
+    main.trigger_prune(app_state)
+
+    assert app_state.session_map == {}
+    assert app_state.session_count == 0
+    assert app_state.worker_load == [0]
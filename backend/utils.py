@@ -1,5 +1,11 @@
 # utility functions used to setup a game or read the opening book
 
+# side-to-move codes stored in Board.color_to_play, integers so color checks in the search are plain int compares
+# flipping sides is color_to_play ^ 1
+WHITE = 0
+BLACK = 1
+COLOR_NAMES = ('white', 'black')    # indexed by color code, for display
+
 # used to convert the 120-length position.board index to a 64-square index for Zobrist hash calculations
 TO_64 = [
     -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
@@ -61,7 +67,7 @@ def board_to_fen(board):
         if rank_start < 91:
             fen += '/'
     
-    fen += f" {board.color_to_play[0]}"
+    fen += ' w' if board.color_to_play == WHITE else ' b'
 
     castling_rights = ""
     if board.white_castle_kingside: castling_rights += 'K'
@@ -104,13 +110,15 @@ def set_board_from_fen(board, fen_string):
             board_index += 1
     board.board = new_board
 
-    board.color_to_play = 'white' if parts[1] == 'w' else 'black'
+    board.color_to_play = WHITE if parts[1] == 'w' else BLACK
     
     castling = parts[2]
-    board.white_castle_kingside = 'K' in castling
-    board.white_castle_queenside = 'Q' in castling
-    board.black_castle_kingside = 'k' in castling
-    board.black_castle_queenside = 'q' in castling
+    # a right is only kept if its king and rook are on their home squares, make_move relies on this
+    board.white_castle_kingside = 'K' in castling and new_board[95] == 'K' and new_board[98] == 'R'
+    board.white_castle_queenside = 'Q' in castling and new_board[95] == 'K' and new_board[91] == 'R'
+    board.black_castle_kingside = 'k' in castling and new_board[25] == 'k' and new_board[28] == 'r'
+    board.black_castle_queenside = 'q' in castling and new_board[25] == 'k' and new_board[21] == 'r'
+    board.castle_rights = board.get_castle_rights_code()
 
     ep_square = parts[3]
     board.en_passant_square = ALGEBRAIC_TO_INDEX.get(ep_square, None)
@@ -119,7 +127,7 @@ def set_board_from_fen(board, fen_string):
     board.ply = 0 # must start at 0 to prevent index errors when checking for repetitions
     
     # board.ply = (int(parts[5]) - 1) * 2
-    # if board.color_to_play == 'black':
+    # if board.color_to_play == BLACK:
     #     board.ply += 1
 
     # clear the old piece lists from the starting position
@@ -129,8 +137,9 @@ def set_board_from_fen(board, fen_string):
     # re-populate the piece lists based on the new board state
     board.initialize_piece_lists()
 
-    # recalculate the hash for the new position and reset the history table
+    # recalculate the hash and incremental evaluation terms for the new position, reset the history table
     board.zobrist_hash = board.compute_hash()
+    board.mg_score, board.eg_score, board.game_phase = board.compute_scores()
     board.history = [board.zobrist_hash]
 
 # parses the user's input (eg. e2e4) and finds the corresponding legal Move object